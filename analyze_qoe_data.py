@@ -8,21 +8,40 @@ analyzes when users correctly identified synthetic videos, and generates visuali
 
 import os
 import sys
+import json
+import time
+import random
+import threading
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import numpy as np
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
-from google.oauth2 import service_account
 
-# Set style for plots
-plt.style.use('ggplot')
-sns.set(style="whitegrid")
+import instrumentation
+from dedup_qoe_data import dedupe_dataframe
+
+# matplotlib, seaborn and the Google API client are imported inside the functions that
+# use them, so that CSV-only runs do not pay for loading them at startup.
 
 # Constants
 SPREADSHEET_ID = '1wkFZdvLvl3PAcP27EmAKaS_LQTvD1_lsRDko-4I3-LY'
-RANGE_NAME = 'Responses_cgreplay_demo_2025!A:Q'  # Adjust range as needed
+SHEET_NAME = 'Responses_cgreplay_demo_2025'
+LAST_COLUMN = 'Q'  # Columns A through LAST_COLUMN are fetched; adjust as needed
+
+# Outputs
+OUTPUT_FORMATS = ['png', 'json', 'both']
+DASHBOARD_FILE = 'dashboard_data.json'  # Read by dashboard.html
+HISTOGRAM_BINS = 10
+SEGMENT_DIMENSIONS = ['Reality', 'User Guess', 'Video List Hash']
+
+# Paged fetching of the Google Sheet
+PAGE_SIZE = 5000  # Rows per values().get request
+MAX_WORKERS = 4  # Concurrent requests
+MAX_RETRIES = 5  # Retries per request on transient errors
+BACKOFF_SECONDS = 1.0  # Initial retry delay, doubled after every attempt
+TRANSIENT_HTTP_STATUSES = {408, 429, 500, 502, 503, 504}
+# Point the Sheets client at another endpoint (e.g. a local fake server for testing)
+API_ENDPOINT_ENV_VAR = 'SHEETS_API_ENDPOINT'
 
 def is_synthetic(filename):
     """
@@ -50,14 +69,30 @@ def is_synthetic(filename):
     # Default to real if we can't determine
     return False
 
-def authenticate_google_sheets():
+def authenticate_google_sheets(api_endpoint=None):
     """
     Authenticate with Google Sheets API.
     
+    Args:
+        api_endpoint (str): Alternative API endpoint, e.g. a local fake Sheets server.
+            Defaults to the SHEETS_API_ENDPOINT environment variable. Requests to an
+            alternative endpoint are sent without credentials.
+        
     Returns:
         service: The Google Sheets service object
     """
+    from googleapiclient.discovery import build
+    from google.oauth2 import service_account
+
+    api_endpoint = api_endpoint or os.environ.get(API_ENDPOINT_ENV_VAR)
+
     try:
+        if api_endpoint:
+            from google.auth.credentials import AnonymousCredentials
+            return build('sheets', 'v4', credentials=AnonymousCredentials(),
+                         client_options={'api_endpoint': api_endpoint},
+                         cache_discovery=False)
+        
         # Try to use service account credentials if available
         if os.path.exists('credentials.json'):
             creds = service_account.Credentials.from_service_account_file(
@@ -78,32 +113,176 @@ def authenticate_google_sheets():
         print(f"Error authenticating with Google Sheets API: {e}")
         sys.exit(1)
 
-def get_data_from_google_sheets():
+def is_transient_error(error):
+    """
+    Determine if a failed Sheets request is worth retrying.
+    
+    Args:
+        error (Exception): The exception raised by the request
+        
+    Returns:
+        bool: True for rate limiting, server errors, timeouts and connection errors
+    """
+    from googleapiclient.errors import HttpError
+
+    if isinstance(error, HttpError):
+        return error.resp.status in TRANSIENT_HTTP_STATUSES
+    return isinstance(error, (OSError, TimeoutError))
+
+def execute_with_retry(make_request, max_retries=MAX_RETRIES, backoff=BACKOFF_SECONDS):
+    """
+    Execute a Sheets API request, retrying transient errors with exponential backoff.
+    
+    Args:
+        make_request (callable): Function that builds the request to execute
+        max_retries (int): Number of retries before giving up
+        backoff (float): Delay before the first retry in seconds
+        
+    Returns:
+        dict: The API response
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return make_request().execute()
+        except Exception as e:
+            if attempt == max_retries or not is_transient_error(e):
+                raise
+            # Random jitter (half to all of the delay) keeps concurrent workers from
+            # retrying in lockstep
+            delay = backoff * (2 ** attempt) * random.uniform(0.5, 1.0)
+            print(f"Transient error from Google Sheets ({e}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+def get_sheet_row_count(service, spreadsheet_id=SPREADSHEET_ID, sheet_name=SHEET_NAME):
+    """
+    Get the number of rows in a sheet, including the header row.
+    
+    Args:
+        service: The Google Sheets service object
+        spreadsheet_id (str): ID of the spreadsheet
+        sheet_name (str): Name of the sheet (tab)
+        
+    Returns:
+        int: Number of rows in the sheet grid
+    """
+    result = execute_with_retry(lambda: service.spreadsheets().get(
+        spreadsheetId=spreadsheet_id,
+        ranges=[sheet_name],
+        fields='sheets(properties(gridProperties(rowCount)))'
+    ))
+    return result['sheets'][0]['properties']['gridProperties']['rowCount']
+
+def fetch_sheet_paged(service_factory, spreadsheet_id=SPREADSHEET_ID, sheet_name=SHEET_NAME,
+                      last_column=LAST_COLUMN, page_size=PAGE_SIZE, max_workers=MAX_WORKERS):
+    """
+    Fetch a sheet in blocks of rows using a bounded pool of concurrent requests.
+    
+    The frame is built column by column as blocks arrive, in row order, so the
+    complete sheet is never held as a list of row lists.
+    
+    Args:
+        service_factory (callable): Returns a Sheets service object. It is called once
+            by the calling thread and once per worker thread, because service objects are
+            not thread-safe.
+        spreadsheet_id (str): ID of the spreadsheet
+        sheet_name (str): Name of the sheet (tab)
+        last_column (str): Last column to fetch, e.g. "Q"
+        page_size (int): Number of rows per request
+        max_workers (int): Maximum number of concurrent requests
+        
+    Returns:
+        pandas.DataFrame: The data from the sheet, or None if the sheet is empty
+    """
+    local = threading.local()
+
+    def fetch_range(range_name):
+        if not hasattr(local, 'service'):
+            local.service = service_factory()
+        result = execute_with_retry(lambda: local.service.spreadsheets().values().get(
+            spreadsheetId=spreadsheet_id,
+            range=range_name
+        ))
+        return result.get('values', [])
+
+    header_rows = fetch_range(f"{sheet_name}!A1:{last_column}1")
+    if not header_rows:
+        return None
+    header = header_rows[0]
+
+    # The header request created the service of this thread; reuse it
+    row_count = get_sheet_row_count(local.service, spreadsheet_id, sheet_name)
+    blocks = [(start, min(start + page_size - 1, row_count))
+              for start in range(2, row_count + 1, page_size)]
+
+    columns = [[] for _ in header]
+    num_rows = 0
+    last_data_row = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Keep at most 2 * max_workers blocks in flight so memory stays bounded
+        block_iter = iter(blocks)
+        pending = deque()
+        for start, end in itertools.islice(block_iter, 2 * max_workers):
+            pending.append((end - start + 1, executor.submit(
+                fetch_range, f"{sheet_name}!A{start}:{last_column}{end}")))
+        while pending:
+            block_size, future = pending.popleft()
+            block = future.result()
+            next_block = next(block_iter, None)
+            if next_block is not None:
+                start, end = next_block
+                pending.append((end - start + 1, executor.submit(
+                    fetch_range, f"{sheet_name}!A{start}:{last_column}{end}")))
+            
+            # The API omits trailing empty cells and rows, so pad every column to the
+            # size of the block to keep rows aligned with the following blocks
+            for column, values in zip(columns, itertools.zip_longest(*block)):
+                column.extend(values)
+            if block:
+                last_data_row = num_rows + len(block)
+            num_rows += block_size
+            for column in columns:
+                column.extend([None] * (num_rows - len(column)))
+
+    # Drop the empty rows at the end of the sheet, like a single A:Q request would
+    for column in columns:
+        del column[last_data_row:]
+
+    df = pd.DataFrame(dict(enumerate(columns)))
+    df.columns = header
+    return df
+
+@instrumentation.instrumented('download', rows=len)
+def get_data_from_google_sheets(dedup_keep='first'):
     """
     Fetch data from Google Sheets.
     
+    Args:
+        dedup_keep (str): Remove duplicate submissions, keeping the "first" or "last"
+            row of each; None keeps every row
+    
     Returns:
         pandas.DataFrame: The data from the Google Sheet
     """
     try:
-        service = authenticate_google_sheets()
-        result = service.spreadsheets().values().get(
-            spreadsheetId=SPREADSHEET_ID,
-            range=RANGE_NAME
-        ).execute()
-        
-        values = result.get('values', [])
-        if not values:
+        # The header is fetched before any worker starts, so credential problems are
+        # reported by the first request
+        df = fetch_sheet_paged(authenticate_google_sheets)
+        if df is None or df.empty:
             print('No data found in the Google Sheet.')
             sys.exit(1)
-            
-        # Convert to DataFrame
-        df = pd.DataFrame(values[1:], columns=values[0])
+        if dedup_keep:
+            # Drop resubmitted evaluations (double-clicks, retries), as download_qoe_data.py does
+            try:
+                df, dropped = dedupe_dataframe(df, keep=dedup_keep)
+                print(f"Removed {dropped} duplicate submissions")
+            except ValueError as e:
+                print(f"Warning: duplicate submissions were not removed: {e}")
         return df
     except Exception as e:
         print(f"Error fetching data from Google Sheets: {e}")
         sys.exit(1)
 
+@instrumentation.instrumented('parse', rows=len)
 def load_data_from_csv(csv_path):
     """
     Load data from a CSV file.
@@ -121,6 +300,23 @@ def load_data_from_csv(csv_path):
         print(f"Error loading data from CSV: {e}")
         sys.exit(1)
 
+def load_data(csv_path=None):
+    """
+    Load data from a CSV file, or from Google Sheets when no file is given.
+    
+    Args:
+        csv_path (str): Path to the CSV file; None fetches the data from Google Sheets
+        
+    Returns:
+        pandas.DataFrame: The data
+    """
+    if csv_path:
+        print(f"Loading data from CSV: {csv_path}")
+        return load_data_from_csv(csv_path)
+    print("Fetching data from Google Sheets...")
+    return get_data_from_google_sheets()
+
+@instrumentation.instrumented('analyze', rows=lambda results: len(results['df']))
 def analyze_data(df):
     """
     Analyze the data to determine when users correctly identified synthetic videos.
@@ -235,120 +431,280 @@ def generate_visualizations(results, output_dir='.'):
         results (dict): Analysis results
         output_dir (str): Directory to save visualizations
     """
+    import numpy as np
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    # Set style for plots
+    plt.style.use('ggplot')
+    sns.set(style="whitegrid")
+
     os.makedirs(output_dir, exist_ok=True)
     
     # 1. Overall accuracy bar chart
-    plt.figure(figsize=(10, 6))
-    plt.bar(['Correct', 'Incorrect'], 
-            [results['overall_accuracy'], 1 - results['overall_accuracy']],
-            color=['#2ecc71', '#e74c3c'],
-            label=['Correct Identifications', 'Incorrect Identifications'])
-    plt.title('Overall Accuracy in Identifying Real vs. Synthetic Videos', fontsize=16)
-    plt.ylabel('Proportion of Responses', fontsize=14)
-    plt.xlabel('User Response Accuracy', fontsize=14)
-    plt.ylim(0, 1)
-    plt.text(0, results['overall_accuracy'] + 0.02, 
-             f"{results['overall_accuracy']:.2%}", 
-             ha='center', fontsize=12)
-    plt.text(1, (1 - results['overall_accuracy']) + 0.02, 
-             f"{1 - results['overall_accuracy']:.2%}", 
-             ha='center', fontsize=12)
-    
-    # Add a legend to explain the color coding
-    handles = [
-        plt.Rectangle((0,0),1,1, color='#2ecc71'),
-        plt.Rectangle((0,0),1,1, color='#e74c3c')
-    ]
-    plt.legend(handles, ['Correct Identifications', 'Incorrect Identifications'], 
-               title='Response Accuracy', loc='upper right')
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, 'overall_accuracy.png'), dpi=300)
-    
-    # 2. Accuracy by video type
-    plt.figure(figsize=(12, 6))
-    video_types = list(results['accuracy_by_type'].keys())
-    accuracies = list(results['accuracy_by_type'].values())
-    
-    # Sort by accuracy
-    sorted_indices = np.argsort(accuracies)[::-1]
-    video_types = [video_types[i] for i in sorted_indices]
-    accuracies = [accuracies[i] for i in sorted_indices]
-    
-    # Add a more descriptive title and labels
-    bars = plt.bar(video_types, accuracies, color='#3498db', 
-                  label='Accuracy Rate')
-    plt.title('Accuracy by Video Type: User Ability to Identify Real vs. Synthetic Videos', fontsize=16)
-    plt.ylabel('Accuracy Rate', fontsize=14)
-    plt.xlabel('Video Scenario', fontsize=14)
-    plt.ylim(0, 1)
-    plt.xticks(rotation=45, ha='right')
-    
-    # Add accuracy values on top of bars
-    for i, bar in enumerate(bars):
-        plt.text(bar.get_x() + bar.get_width()/2, 
-                 bar.get_height() + 0.02, 
-                 f"{accuracies[i]:.2%}", 
+    with instrumentation.stage('plot:overall_accuracy'):
+        plt.figure(figsize=(10, 6))
+        plt.bar(['Correct', 'Incorrect'], 
+                [results['overall_accuracy'], 1 - results['overall_accuracy']],
+                color=['#2ecc71', '#e74c3c'],
+                label=['Correct Identifications', 'Incorrect Identifications'])
+        plt.title('Overall Accuracy in Identifying Real vs. Synthetic Videos', fontsize=16)
+        plt.ylabel('Proportion of Responses', fontsize=14)
+        plt.xlabel('User Response Accuracy', fontsize=14)
+        plt.ylim(0, 1)
+        plt.text(0, results['overall_accuracy'] + 0.02, 
+                 f"{results['overall_accuracy']:.2%}", 
+                 ha='center', fontsize=12)
+        plt.text(1, (1 - results['overall_accuracy']) + 0.02, 
+                 f"{1 - results['overall_accuracy']:.2%}", 
                  ha='center', fontsize=12)
     
-    # Add a legend to explain the bars
-    plt.legend(loc='lower left')
+        # Add a legend to explain the color coding
+        handles = [
+            plt.Rectangle((0,0),1,1, color='#2ecc71'),
+            plt.Rectangle((0,0),1,1, color='#e74c3c')
+        ]
+        plt.legend(handles, ['Correct Identifications', 'Incorrect Identifications'], 
+                   title='Response Accuracy', loc='upper right')
+        plt.tight_layout()
+        plt.savefig(os.path.join(output_dir, 'overall_accuracy.png'), dpi=300)
     
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, 'accuracy_by_type.png'), dpi=300)
+    # 2. Accuracy by video type
+    with instrumentation.stage('plot:accuracy_by_type'):
+        plt.figure(figsize=(12, 6))
+        video_types = list(results['accuracy_by_type'].keys())
+        accuracies = list(results['accuracy_by_type'].values())
+    
+        # Sort by accuracy
+        sorted_indices = np.argsort(accuracies)[::-1]
+        video_types = [video_types[i] for i in sorted_indices]
+        accuracies = [accuracies[i] for i in sorted_indices]
+    
+        # Add a more descriptive title and labels
+        bars = plt.bar(video_types, accuracies, color='#3498db', 
+                      label='Accuracy Rate')
+        plt.title('Accuracy by Video Type: User Ability to Identify Real vs. Synthetic Videos', fontsize=16)
+        plt.ylabel('Accuracy Rate', fontsize=14)
+        plt.xlabel('Video Scenario', fontsize=14)
+        plt.ylim(0, 1)
+        plt.xticks(rotation=45, ha='right')
+    
+        # Add accuracy values on top of bars
+        for i, bar in enumerate(bars):
+            plt.text(bar.get_x() + bar.get_width()/2, 
+                     bar.get_height() + 0.02, 
+                     f"{accuracies[i]:.2%}", 
+                     ha='center', fontsize=12)
+    
+        # Add a legend to explain the bars
+        plt.legend(loc='lower left')
+    
+        plt.tight_layout()
+        plt.savefig(os.path.join(output_dir, 'accuracy_by_type.png'), dpi=300)
     
     # 3. Confusion matrix heatmap
-    plt.figure(figsize=(10, 8))
-    sns.heatmap(results['confusion_matrix'], annot=True, cmap='Blues', fmt='.2%',
-                cbar_kws={'label': 'Proportion of Responses'})
-    plt.title('Confusion Matrix: Actual Video Reality vs. User Guess', fontsize=16)
-    plt.ylabel('Actual Reality (Ground Truth)', fontsize=14)
-    plt.xlabel('User Guess (Perceived Reality)', fontsize=14)
-    
-    # Add a text annotation
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, 'confusion_matrix.png'), dpi=300)
+    with instrumentation.stage('plot:confusion_matrix'):
+        plt.figure(figsize=(10, 8))
+        sns.heatmap(results['confusion_matrix'], annot=True, cmap='Blues', fmt='.2%',
+                    cbar_kws={'label': 'Proportion of Responses'})
+        plt.title('Confusion Matrix: Actual Video Reality vs. User Guess', fontsize=16)
+        plt.ylabel('Actual Reality (Ground Truth)', fontsize=14)
+        plt.xlabel('User Guess (Perceived Reality)', fontsize=14)
+    
+        # Add a text annotation
+        plt.tight_layout()
+        plt.savefig(os.path.join(output_dir, 'confusion_matrix.png'), dpi=300)
     
     # 4. Distribution of user accuracy
-    plt.figure(figsize=(10, 6))
-    # Create the histogram with KDE and explicitly label the KDE curve
-    ax = sns.histplot(results['accuracy_by_user'], bins=10, kde=True, color='#9b59b6')
-    # Get the line objects from the axes
-    lines = ax.get_lines()
-    # The first line should be the KDE curve
-    if lines:
-        # Set the label for the KDE curve
-        lines[0].set_label('Density Estimation (KDE)')
-    
-    plt.title('Distribution of User Accuracy', fontsize=16)
-    plt.xlabel('Accuracy', fontsize=14)
-    plt.ylabel('Number of Users', fontsize=14)
-    plt.axvline(results['overall_accuracy'], color='red', linestyle='--', 
-                label=f'Overall Accuracy: {results["overall_accuracy"]:.2%}')
-    # Add a more descriptive legend that explains all elements
-    plt.legend(title='Legend', loc='best')
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, 'user_accuracy_distribution.png'), dpi=300)
+    with instrumentation.stage('plot:user_accuracy_distribution'):
+        plt.figure(figsize=(10, 6))
+        # Create the histogram with KDE and explicitly label the KDE curve
+        ax = sns.histplot(results['accuracy_by_user'], bins=10, kde=True, color='#9b59b6')
+        # Get the line objects from the axes
+        lines = ax.get_lines()
+        # The first line should be the KDE curve
+        if lines:
+            # Set the label for the KDE curve
+            lines[0].set_label('Density Estimation (KDE)')
+    
+        plt.title('Distribution of User Accuracy', fontsize=16)
+        plt.xlabel('Accuracy', fontsize=14)
+        plt.ylabel('Number of Users', fontsize=14)
+        plt.axvline(results['overall_accuracy'], color='red', linestyle='--', 
+                    label=f'Overall Accuracy: {results["overall_accuracy"]:.2%}')
+        # Add a more descriptive legend that explains all elements
+        plt.legend(title='Legend', loc='best')
+        plt.tight_layout()
+        plt.savefig(os.path.join(output_dir, 'user_accuracy_distribution.png'), dpi=300)
     
     print(f"Visualizations saved to {output_dir}")
 
-def main():
-    """Main function."""
-    import argparse
+def segment_counts(df, dimensions=SEGMENT_DIMENSIONS, weights=None):
+    """
+    Count responses and correct guesses for every combination of the segment dimensions.
     
-    parser = argparse.ArgumentParser(description='Analyze QoE data and generate visualizations.')
-    parser.add_argument('--csv', type=str, help='Path to CSV file with QoE data')
-    parser.add_argument('--output', type=str, default='visualizations', 
-                        help='Directory to save visualizations')
-    args = parser.parse_args()
+    Args:
+        df (pandas.DataFrame): Analyzed data (output of analyze_data)
+        dimensions (list): Columns to group by; columns missing from df are skipped
+        weights (pandas.Series): Optional weight of each row (e.g. sampling weights);
+            the counts are then sums of weights
+        
+    Returns:
+        pandas.DataFrame: One row per combination, with "size" and "sum" count columns
+    """
+    dimensions = [dim for dim in dimensions if dim in df.columns]
+    grouped = df.assign(**{dim: df[dim].fillna('Unknown').astype(str) for dim in dimensions})
+    if weights is None:
+        return (grouped.groupby(dimensions, sort=True)['Correct Guess']
+                       .agg(['size', 'sum'])
+                       .reset_index())
+    grouped = grouped.assign(size=weights, sum=weights * grouped['Correct Guess'].astype(float))
+    return grouped.groupby(dimensions, sort=True)[['size', 'sum']].sum().reset_index()
+
+def build_dashboard_data(results, bins=HISTOGRAM_BINS):
+    """
+    Collect the aggregates behind the visualizations in a JSON-serializable form.
+    
+    Besides the numbers shown in the PNG charts, this includes a segment cube: response
+    and correct-guess counts for every combination of SEGMENT_DIMENSIONS. The dashboard
+    can recompute accuracy and the confusion matrix for any filter from the cube.
+    
+    Args:
+        results (dict): Analysis results; when they carry precomputed "segments" counts
+            (see segment_counts), the raw "df" is not needed
+        bins (int): Number of bins of the user accuracy histogram
+        
+    Returns:
+        dict: Dashboard data
+    """
+    import numpy as np
+
+    def clean(value):
+        # JSON has no NaN; missing values become null
+        return None if pd.isna(value) else round(float(value), 6)
+
+    def count(value):
+        # Weighted (estimated) counts are fractional; plain counts stay integers
+        value = float(value)
+        return int(value) if value.is_integer() else round(value, 6)
+
+    confusion_matrix = results['confusion_matrix']
+
+    # A sample carries the accuracy and weight of each sampled user (see
+    # preview_sampling.sampled_users); otherwise every user counts once
+    sampled = results.get('sampled_users')
+    if sampled is not None:
+        sampled = sampled.dropna(subset=['Accuracy'])
+        user_accuracy, user_weights = sampled['Accuracy'], sampled['Weight']
+    else:
+        user_accuracy, user_weights = results['accuracy_by_user'].dropna(), None
+    counts, edges = np.histogram(user_accuracy, bins=bins, range=(0, 1), weights=user_weights)
+
+    segments = results['segments'] if 'segments' in results else segment_counts(results['df'])
+    dimensions = [col for col in segments.columns if col not in ('size', 'sum')]
+
+    return {
+        'generated_at': pd.Timestamp.now(tz='UTC').isoformat(),
+        'estimated': bool(results.get('estimated', False)),
+        'responses': count(segments['size'].sum()),
+        'users': count(user_weights.sum() if user_weights is not None
+                       else results['accuracy_by_user'].index.nunique()),
+        'overall_accuracy': clean(results['overall_accuracy']),
+        'accuracy_by_type': {str(k): clean(v) for k, v in results['accuracy_by_type'].items()},
+        'confusion_matrix': {
+            'rows': [str(r) for r in confusion_matrix.index],
+            'columns': [str(c) for c in confusion_matrix.columns],
+            'values': [[clean(v) for v in row] for row in confusion_matrix.to_numpy()]
+        },
+        'user_accuracy_histogram': {
+            'edges': [clean(e) for e in edges],
+            'counts': [count(c) for c in counts]
+        },
+        'segments': {
+            'dimensions': dimensions,
+            'rows': [[*(str(v) for v in row[:-2]), count(row[-2]), count(row[-1])]
+                     for row in segments.itertuples(index=False)]
+        }
+    }
+
+def write_dashboard_data(results, output_dir='.'):
+    """
+    Write the dashboard aggregates to a compact JSON file.
     
+    Args:
+        results (dict): Analysis results
+        output_dir (str): Directory to save the JSON file
+        
+    Returns:
+        str: Path of the written file
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, DASHBOARD_FILE)
+    with instrumentation.stage('dashboard_json'):
+        data = build_dashboard_data(results)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+    print(f"Dashboard data saved to {path}")
+    return path
+
+def print_sample_estimates(estimates, design):
+    """
+    Print metrics estimated from a preview sample with their standard errors.
+    
+    Args:
+        estimates (dict): Output of preview_sampling.estimate_metrics
+        design (pandas.DataFrame): Sample design from preview_sampling.sample_users_from_csv
+    """
+    print("\nSample design (users per Video List Hash):")
+    for stratum, row in design.iterrows():
+        population = f"{row['Population Users']:.0f}" if row['Known Size'] else f"~{row['Population Users']:.0f}"
+        print(f"  {stratum}: {row['Sampled Users']} of {population} users ({row['Rows Scanned']} rows scanned)")
+    
+    accuracy, error = estimates['overall_accuracy']
+    print("\nSummary Statistics (estimate ± standard error):")
+    print(f"Overall accuracy: {accuracy:.2%} ± {error:.2%}")
+    print("\nAccuracy by video type:")
+    for video_type, (accuracy, error) in estimates['accuracy_by_type'].items():
+        print(f"  {video_type}: {accuracy:.2%} ± {error:.2%}")
+    print("\nConfusion matrix (rows: actual reality, columns: user guess):")
+    matrix = estimates['confusion_matrix'].map(lambda v: f"{v:.1%}") + \
+        estimates['confusion_matrix_se'].map(lambda v: f" ± {v:.1%}")
+    with pd.option_context('display.width', 200, 'display.max_columns', 10):
+        print(matrix.to_string())
+
+def run_analysis(csv_path=None, output_dir='visualizations', output_format='png',
+                 sample_size=None, sample_seed=0):
+    """
+    Load, analyze and visualize the QoE data.
+    
+    Args:
+        csv_path (str): Path to a CSV file; when None the data is fetched from Google Sheets
+        output_dir (str): Directory to save visualizations
+        output_format (str): "png" to render the charts, "json" to write the dashboard
+            data only, or "both"
+        sample_size (int): When set, analyze a stratified random sample of this many
+            users from csv_path instead of all of the data (preview mode)
+        sample_seed (int): Seed of the preview sample
+    """
     print("QoE Data Analysis")
     print("----------------")
     
     # Get data
-    if args.csv:
-        print(f"Loading data from CSV: {args.csv}")
-        df = load_data_from_csv(args.csv)
+    design = None
+    if csv_path and sample_size:
+        from preview_sampling import sample_users_from_csv
+        print(f"Sampling {sample_size} users from CSV: {csv_path}")
+        try:
+            df, design = sample_users_from_csv(csv_path, sample_size, sample_seed)
+        except (OSError, ValueError) as e:
+            print(f"Error sampling data from CSV: {e}")
+            sys.exit(1)
+    elif csv_path:
+        print(f"Loading data from CSV: {csv_path}")
+        df = load_data_from_csv(csv_path)
     else:
+        if sample_size:
+            print("Warning: --sample needs --csv; analyzing all of the data")
         print("Fetching data from Google Sheets...")
         df = get_data_from_google_sheets()
     
@@ -359,17 +715,54 @@ def main():
     results = analyze_data(df)
     
     # Print summary statistics
-    print("\nSummary Statistics:")
-    print(f"Overall accuracy: {results['overall_accuracy']:.2%}")
-    print("\nAccuracy by video type:")
-    for video_type, accuracy in results['accuracy_by_type'].items():
-        print(f"  {video_type}: {accuracy:.2%}")
+    if design is not None:
+        from preview_sampling import estimate_metrics, sampled_users, sampling_weights
+        estimates = estimate_metrics(results, design)
+        print_sample_estimates(estimates, design)
+        # Chart the design-weighted estimates rather than the raw sample proportions. The
+        # dashboard cube is weighted the same way, so filtered views match these estimates.
+        results['overall_accuracy'] = estimates['overall_accuracy'][0]
+        results['accuracy_by_type'] = {k: v[0] for k, v in estimates['accuracy_by_type'].items()}
+        results['confusion_matrix'] = estimates['confusion_matrix']
+        results['segments'] = segment_counts(results['df'], weights=sampling_weights(results['df'], design))
+        results['sampled_users'] = sampled_users(results['df'], design)
+        results['estimated'] = True
+    else:
+        print("\nSummary Statistics:")
+        print(f"Overall accuracy: {results['overall_accuracy']:.2%}")
+        print("\nAccuracy by video type:")
+        for video_type, accuracy in results['accuracy_by_type'].items():
+            print(f"  {video_type}: {accuracy:.2%}")
     
     # Generate visualizations
-    print("\nGenerating visualizations...")
-    generate_visualizations(results, args.output)
+    if output_format in ('png', 'both'):
+        print("\nGenerating visualizations...")
+        generate_visualizations(results, output_dir)
+    if output_format in ('json', 'both'):
+        print("\nWriting dashboard data...")
+        write_dashboard_data(results, output_dir)
     
     print("\nAnalysis complete!")
 
+def main():
+    """Main function."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Analyze QoE data and generate visualizations.')
+    parser.add_argument('--csv', type=str, help='Path to CSV file with QoE data')
+    parser.add_argument('--output', type=str, default='visualizations', 
+                        help='Directory to save visualizations')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='png',
+                        help='Render PNG charts, write dashboard JSON for dashboard.html, or both (default: png)')
+    parser.add_argument('--sample', type=int, metavar='N',
+                        help='Preview mode: analyze a random sample of N users, stratified by Video List Hash')
+    parser.add_argument('--sample-seed', type=int, default=0,
+                        help='Seed of the preview sample (default: 0)')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    
+    with instrumentation.from_arguments(args):
+        run_analysis(args.csv, args.output, args.format, args.sample, args.sample_seed)
+
 if __name__ == "__main__":
     main()
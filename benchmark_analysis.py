@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Analysis Benchmark Suite
+
+This script times the code paths we care about at several data sizes, so that a change
+that slows them down is noticed before it reaches a live study:
+
+- load_data_from_csv, analyze_data and generate_visualizations on sample data built
+  with generate_sample_data at growing numbers of users
+- generate_pairs_for_user and select_random_pairs_with_seed at growing video counts
+- get_video_files and calculate_files_hash over synthetic directory trees
+
+Results can be saved as a baseline and later runs compared against it, failing when a
+benchmark is slower than the baseline by more than the threshold.
+
+Usage:
+    python benchmark_analysis.py                          # run and print timings
+    python benchmark_analysis.py --save-baseline          # record the current timings
+    python benchmark_analysis.py --compare --threshold 0.2
+    python benchmark_analysis.py --filter pairs --quick   # only the pair benchmarks, small sizes
+"""
+
+import argparse
+import csv
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmark_startup import find_regressions, load_baseline, report_regressions, save_baseline
+
+# Constants
+BASELINE_FILE = 'benchmark_analysis_baseline.json'
+DEFAULT_THRESHOLD = 0.25  # Flag results more than 25% slower than the baseline
+USER_SCALES = [100, 1000, 10000]
+PLOT_USER_SCALES = [100, 1000]  # Rendering is slow; larger sizes add little information
+VIDEO_SCALES = [8, 32, 128]
+FILE_SCALES = [100, 1000, 10000]
+QUICK_SCALE_COUNT = 1
+SEED = 42
+
+def time_call(func, repeat):
+    """
+    Time a function call.
+
+    Args:
+        func (callable): Function to time, called without arguments
+        repeat (int): Number of runs
+
+    Returns:
+        float: Median wall time in seconds
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def write_sample_csv(path, num_users):
+    """Write a sample QoE CSV with the given number of users."""
+    from generate_sample_data import generate_sample_data
+
+    random.seed(SEED)
+    rows = generate_sample_data(num_users=num_users)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(rows)
+
+def make_video_tree(root, num_files, files_per_dir=50):
+    """Create a directory tree of empty .mp4 files and return its root."""
+    for i in range(num_files):
+        subdir = os.path.join(root, f"batch_{i // files_per_dir:04d}")
+        os.makedirs(subdir, exist_ok=True)
+        with open(os.path.join(subdir, f"video_{i:06d}.mp4"), 'wb'):
+            pass
+    return root
+
+def analysis_benchmarks(workdir, user_scales, plot_user_scales):
+    """Yield (name, function) pairs for the CSV loading, analysis and plotting benchmarks."""
+    from analyze_qoe_data import load_data_from_csv, analyze_data, generate_visualizations
+
+    for num_users in user_scales:
+        csv_path = os.path.join(workdir, f"sample_{num_users}.csv")
+        write_sample_csv(csv_path, num_users)
+        df = load_data_from_csv(csv_path)
+        yield f"load_data_from_csv[users={num_users}]", lambda p=csv_path: load_data_from_csv(p)
+        yield f"analyze_data[users={num_users}]", lambda d=df: analyze_data(d.copy())
+
+        if num_users in plot_user_scales:
+            results = analyze_data(df.copy())
+            output_dir = os.path.join(workdir, f"plots_{num_users}")
+
+            def plot(r=results, o=output_dir):
+                import matplotlib.pyplot as plt
+                generate_visualizations(r, o)
+                plt.close('all')
+
+            yield f"generate_visualizations[users={num_users}]", plot
+
+def pair_benchmarks(video_scales):
+    """Yield (name, function) pairs for the pair generation benchmarks."""
+    from retrieve_videos_from_user_hash_id import (
+        generate_pairs_for_user, hash_string_to_seed, select_random_pairs_with_seed
+    )
+
+    rng = random.Random(SEED)
+    user_ids = [''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789')
+                        for _ in range(10)) for _ in range(100)]
+    for num_videos in video_scales:
+        videos = [f"videos/video_{i:04d}.mp4" for i in range(num_videos)]
+        all_pairs = [{"videoA": videos[i], "videoB": videos[j]}
+                     for i in range(num_videos) for j in range(i + 1, num_videos)]
+
+        def generate(v=videos):
+            for user_id in user_ids:
+                generate_pairs_for_user(user_id, v)
+
+        def select(p=all_pairs):
+            for user_id in user_ids:
+                select_random_pairs_with_seed(p, 5, hash_string_to_seed(user_id))
+
+        yield f"generate_pairs_for_user[videos={num_videos},users=100]", generate
+        yield f"select_random_pairs_with_seed[videos={num_videos},users=100]", select
+
+def hash_benchmarks(workdir, file_scales):
+    """Yield (name, function) pairs for the video list hashing benchmarks."""
+    from generate_video_list import calculate_files_hash, get_video_files
+
+    for num_files in file_scales:
+        root = make_video_tree(os.path.join(workdir, f"videos_{num_files}"), num_files)
+        files = sorted(get_video_files(root))
+        yield f"get_video_files[files={num_files}]", lambda r=root: get_video_files(r)
+        yield f"calculate_files_hash[files={num_files}]", lambda f=files: calculate_files_hash(f)
+
+def run_benchmarks(groups, repeat, quick=False, name_filter=None):
+    """
+    Run the selected benchmark groups.
+
+    Args:
+        groups (list): Benchmark groups to run ("analysis", "pairs", "hash")
+        repeat (int): Number of runs per benchmark
+        quick (bool): Only run the smallest sizes
+        name_filter (str): Only run benchmarks whose name contains this string
+
+    Returns:
+        dict: Benchmark name -> median seconds
+    """
+    def scales(values):
+        return values[:QUICK_SCALE_COUNT] if quick else values
+
+    workdir = tempfile.mkdtemp(prefix='qoe_bench_')
+    os.environ.setdefault('MPLBACKEND', 'Agg')  # Render without a display
+    results = {}
+    try:
+        generators = []
+        if 'analysis' in groups:
+            generators.append(analysis_benchmarks(workdir, scales(USER_SCALES), scales(PLOT_USER_SCALES)))
+        if 'pairs' in groups:
+            generators.append(pair_benchmarks(scales(VIDEO_SCALES)))
+        if 'hash' in groups:
+            generators.append(hash_benchmarks(workdir, scales(FILE_SCALES)))
+
+        for generator in generators:
+            for name, func in generator:
+                if name_filter and name_filter not in name:
+                    continue
+                # Warm-up run so imports and caches do not count against the first benchmark
+                func()
+                seconds = time_call(func, repeat)
+                results[name] = seconds
+                print(f"  {name:<60} {seconds * 1000:10.2f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description='Benchmark the analysis, pair generation and hashing code.')
+    parser.add_argument('--groups', nargs='+', choices=['analysis', 'pairs', 'hash'],
+                        default=['analysis', 'pairs', 'hash'],
+                        help='Benchmark groups to run (default: all)')
+    parser.add_argument('--filter', type=str,
+                        help='Only run benchmarks whose name contains this string')
+    parser.add_argument('--quick', action='store_true',
+                        help='Only run the smallest size of each benchmark')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Number of runs per benchmark; the median is reported (default: 5)')
+    parser.add_argument('--baseline', type=str, default=BASELINE_FILE,
+                        help=f'Baseline file (default: {BASELINE_FILE})')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Save the results as the new baseline')
+    parser.add_argument('--compare', action='store_true',
+                        help='Compare against the baseline and exit with status 1 on regressions')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'Relative slowdown flagged as a regression (default: {DEFAULT_THRESHOLD})')
+    args = parser.parse_args()
+
+    print("Analysis Benchmark Suite")
+    print("------------------------")
+
+    results = run_benchmarks(args.groups, args.repeat, args.quick, args.filter)
+
+    exit_code = 0
+    if args.compare:
+        regressions = find_regressions(results, load_baseline(args.baseline), args.threshold)
+        exit_code = report_regressions(regressions, args.threshold)
+    if args.save_baseline:
+        # Keep entries for benchmarks that were not run this time
+        baseline = load_baseline(args.baseline)
+        baseline.update(results)
+        save_baseline(baseline, args.baseline)
+
+    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
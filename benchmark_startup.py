@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Startup Time Benchmark
+
+This script measures how long each entry point takes to import, using
+`python -X importtime`, so that slow module-level imports are caught before they
+reach the cron and CI jobs. Results can be saved as a baseline and later runs
+compared against it.
+
+Usage:
+    python benchmark_startup.py                          # print import times
+    python benchmark_startup.py --save-baseline          # record the current times
+    python benchmark_startup.py --compare --threshold 0.2
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Constants
+ENTRY_POINTS = [
+    'analyze_qoe_data',
+    'download_qoe_data',
+    'retrieve_videos_from_user_hash_id',
+    'generate_video_list',
+    'generate_sample_data',
+    'run_pipeline',
+    'dedup_qoe_data',
+    'rank_techniques',
+    'rater_statistics',
+    'visual_cues',
+    'simulate_pair_coverage',
+    'qoe_time_series',
+    'federated_analysis'
+]
+BASELINE_FILE = 'benchmark_startup_baseline.json'
+DEFAULT_THRESHOLD = 0.25  # Flag results more than 25% slower than the baseline
+
+def measure_import_time(module_name, top=5):
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Args:
+        module_name (str): Name of the module to import
+        top (int): Number of slowest imported packages to report
+
+    Returns:
+        dict: Total import time in seconds and the slowest imported packages
+    """
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module_name}'],
+        cwd=repo_dir, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Failed to import {module_name}: {proc.stderr.strip().splitlines()[-1]}")
+
+    # Lines look like: "import time:       self [us] |  cumulative | imported package"
+    total_us = 0
+    packages = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        fields = line[len('import time:'):].split('|')
+        try:
+            cumulative = int(fields[1])
+        except ValueError:
+            continue  # Header line
+        name = fields[2]
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        # Lines are printed after their children, so the direct imports of the
+        # entry point are the depth-1 lines since the previous top-level line
+        if depth == 0:
+            if name.strip() == module_name:
+                total_us = cumulative
+                break
+            packages = []
+        elif depth == 1:
+            packages.append((name.strip(), cumulative))
+
+    packages.sort(key=lambda p: p[1], reverse=True)
+    return {
+        'seconds': total_us / 1e6,
+        'slowest': [{'package': name, 'seconds': us / 1e6} for name, us in packages[:top]]
+    }
+
+def load_baseline(path):
+    """Load previously saved benchmark results, keyed by benchmark name."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def save_baseline(results, path):
+    """Save benchmark results (name -> seconds) as the new baseline."""
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"Baseline saved to {path}")
+
+def find_regressions(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare benchmark results against a baseline.
+
+    Args:
+        results (dict): Current results, name -> seconds
+        baseline (dict): Baseline results, name -> seconds
+        threshold (float): Allowed relative slowdown before a result is flagged
+
+    Returns:
+        list: (name, baseline seconds, current seconds) for every regression
+    """
+    regressions = []
+    for name, seconds in results.items():
+        previous = baseline.get(name)
+        if previous and seconds > previous * (1 + threshold):
+            regressions.append((name, previous, seconds))
+    return regressions
+
+def report_regressions(regressions, threshold):
+    """Print regressions and return the process exit code."""
+    if not regressions:
+        print(f"\nNo regressions beyond {threshold:.0%}")
+        return 0
+    print(f"\nRegressions beyond {threshold:.0%}:")
+    for name, previous, seconds in regressions:
+        print(f"  {name}: {previous:.4f}s -> {seconds:.4f}s ({seconds / previous - 1:+.0%})")
+    return 1
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description='Benchmark the import time of each entry point.')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Number of runs per entry point; the median is reported (default: 5)')
+    parser.add_argument('--baseline', type=str, default=BASELINE_FILE,
+                        help=f'Baseline file (default: {BASELINE_FILE})')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Save the results as the new baseline')
+    parser.add_argument('--compare', action='store_true',
+                        help='Compare against the baseline and exit with status 1 on regressions')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'Relative slowdown flagged as a regression (default: {DEFAULT_THRESHOLD})')
+    args = parser.parse_args()
+
+    print("Startup Time Benchmark")
+    print("----------------------")
+
+    results = {}
+    for module_name in ENTRY_POINTS:
+        try:
+            runs = [measure_import_time(module_name) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"  {module_name:<36} error: {e}")
+            continue
+        seconds = statistics.median(run['seconds'] for run in runs)
+        results[module_name] = seconds
+        slowest = ', '.join(f"{p['package']} {p['seconds']:.3f}s" for p in runs[-1]['slowest'][:3])
+        print(f"  {module_name:<36} {seconds:8.3f}s  ({slowest})")
+
+    exit_code = 0
+    if args.compare:
+        regressions = find_regressions(results, load_baseline(args.baseline), args.threshold)
+        exit_code = report_regressions(regressions, args.threshold)
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+
+    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Duplicate Submission Filter for QoE Data
+
+Double-clicks and network retries in the frontend can submit the same evaluation more
+than once. This script removes those duplicates from a QoE data CSV in a streaming pass.
+Rows are keyed on (User ID, Scene, Video A Filename, Video B Filename). Only a compact
+64-bit hash of each key is kept in memory, never the rows themselves.
+
+Usage:
+    python dedup_qoe_data.py qoe_data.csv                      # dedupe in place, keep earliest
+    python dedup_qoe_data.py qoe_data.csv --keep last -o clean.csv
+"""
+
+import argparse
+import csv
+import hashlib
+import os
+import sys
+
+import instrumentation
+
+# Constants
+KEY_COLUMNS = ['User ID', 'Scene', 'Video A Filename', 'Video B Filename']
+KEEP_OPTIONS = ['first', 'last']
+
+def resolve_key_columns(columns, key_columns=KEY_COLUMNS):
+    """
+    Find the actual header names of the key columns.
+
+    Headers are matched like analyze_data does: an exact name wins, otherwise the first
+    header that contains the key name, ignoring case.
+
+    Args:
+        columns (iterable): Header names of the data
+        key_columns (list): Columns that identify a submission
+
+    Returns:
+        list: Header names, in the order of key_columns
+
+    Raises:
+        ValueError: If a key column has no matching header
+    """
+    columns = list(columns)
+    resolved, missing = [], []
+    for key in key_columns:
+        if key in columns:
+            resolved.append(key)
+            continue
+        match = next((col for col in columns if key.lower() in str(col).lower()), None)
+        if match is None:
+            missing.append(key)
+        else:
+            resolved.append(match)
+    if missing:
+        raise ValueError(f"Missing key columns: {', '.join(missing)}")
+    return resolved
+
+def key_digest(values):
+    """
+    Hash the key values of a row into a 64-bit integer.
+
+    At 64 bits the chance of two distinct keys colliding is negligible even for
+    hundreds of millions of rows, and each key costs a single small int in memory.
+
+    Args:
+        values (iterable): Key values of the row, as strings
+
+    Returns:
+        int: The hashed key
+    """
+    key = '\x1f'.join(value.strip() for value in values)
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def row_key(row, key_columns=KEY_COLUMNS):
+    """
+    Hash the key columns of a row into a 64-bit integer.
+
+    Args:
+        row (dict): CSV row
+        key_columns (list): Header names of the columns that identify a submission
+
+    Returns:
+        int: The hashed key
+    """
+    return key_digest(row.get(col) or '' for col in key_columns)
+
+def iter_unique_rows(rows, keep_indices=None, key_columns=KEY_COLUMNS):
+    """
+    Yield the rows that are not duplicates of an earlier row.
+
+    Args:
+        rows (iterable): CSV rows as dicts
+        keep_indices (set): When given, yield exactly the rows at these positions instead
+            of the first row per key (used to keep the latest row per key)
+        key_columns (list): Columns that identify a submission
+
+    Yields:
+        dict: Unique rows, in their original order
+    """
+    if keep_indices is not None:
+        for index, row in enumerate(rows):
+            if index in keep_indices:
+                yield row
+        return
+
+    seen = set()
+    for row in rows:
+        key = row_key(row, key_columns)
+        if key not in seen:
+            seen.add(key)
+            yield row
+
+def last_row_indices(rows, key_columns=KEY_COLUMNS):
+    """
+    Find the position of the last row for every key.
+
+    Args:
+        rows (iterable): CSV rows as dicts
+        key_columns (list): Columns that identify a submission
+
+    Returns:
+        set: Row positions to keep
+    """
+    last_index = {}
+    for index, row in enumerate(rows):
+        last_index[row_key(row, key_columns)] = index
+    return set(last_index.values())
+
+def dedupe_csv(input_file, output_file=None, keep='first', key_columns=KEY_COLUMNS):
+    """
+    Remove duplicate submissions from a CSV file.
+
+    Keeping the first row needs a single pass. Keeping the last row needs two passes
+    over the file, the first of which only records row positions.
+
+    Args:
+        input_file (str): Path to the CSV file
+        output_file (str): Path to write the result to; defaults to rewriting input_file
+        keep (str): "first" to keep the earliest row per key, "last" to keep the latest
+        key_columns (list): Columns that identify a submission
+
+    Returns:
+        tuple: (rows kept, rows dropped)
+    """
+    if keep not in KEEP_OPTIONS:
+        raise ValueError(f"keep must be one of {KEEP_OPTIONS}, got {keep!r}")
+    output_file = output_file or input_file
+
+    with instrumentation.stage('dedup') as record:
+        with open(input_file, 'r', newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            fieldnames = reader.fieldnames or []
+            key_columns = resolve_key_columns(fieldnames, key_columns)
+            keep_indices = last_row_indices(reader, key_columns) if keep == 'last' else None
+
+        total = 0
+        kept = 0
+        tmp_file = f"{output_file}.tmp"
+        with open(input_file, 'r', newline='', encoding='utf-8') as f_in, \
+                open(tmp_file, 'w', newline='', encoding='utf-8') as f_out:
+            reader = csv.DictReader(f_in)
+            writer = csv.DictWriter(f_out, fieldnames=fieldnames)
+            writer.writeheader()
+
+            def counted(rows):
+                nonlocal total
+                for row in rows:
+                    total += 1
+                    yield row
+
+            for row in iter_unique_rows(counted(reader), keep_indices, key_columns):
+                writer.writerow(row)
+                kept += 1
+        os.replace(tmp_file, output_file)
+
+        record['rows'] = total
+        record['dropped'] = total - kept
+
+    return kept, total - kept
+
+def dedupe_dataframe(df, keep='first', key_columns=KEY_COLUMNS):
+    """
+    Remove duplicate submissions from data that is already in memory.
+
+    Uses the same keys as dedupe_csv, so both paths drop the same rows.
+
+    Args:
+        df (pandas.DataFrame): QoE data
+        keep (str): "first" to keep the earliest row per key, "last" to keep the latest
+        key_columns (list): Columns that identify a submission
+
+    Returns:
+        tuple: (deduplicated DataFrame, rows dropped)
+    """
+    import pandas as pd
+
+    if keep not in KEEP_OPTIONS:
+        raise ValueError(f"keep must be one of {KEEP_OPTIONS}, got {keep!r}")
+    columns = resolve_key_columns(df.columns, key_columns)
+    with instrumentation.stage('dedup', rows=len(df)) as record:
+        values = df[columns].fillna('').astype(str)
+        keys = [key_digest(row) for row in values.itertuples(index=False, name=None)]
+        duplicated = pd.Series(keys, index=df.index).duplicated(keep=keep)
+        record['dropped'] = int(duplicated.sum())
+    return df[~duplicated.to_numpy()], int(duplicated.sum())
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description='Remove duplicate submissions from a QoE data CSV.')
+    parser.add_argument('csv', type=str, help='Path to the CSV file with QoE data')
+    parser.add_argument('-o', '--output', type=str,
+                        help='Output CSV file (default: rewrite the input file)')
+    parser.add_argument('--keep', choices=KEEP_OPTIONS, default='first',
+                        help='Keep the earliest or the latest row per submission (default: first)')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        with instrumentation.from_arguments(args):
+            kept, dropped = dedupe_csv(args.csv, args.output, args.keep)
+    except Exception as e:
+        print(f"Error removing duplicates: {e}")
+        sys.exit(1)
+
+    print(f"Kept {kept} rows, dropped {dropped} duplicate submissions")
+    print(f"Saved to {args.output or args.csv}")
+
+if __name__ == "__main__":
+    main()
@@ -8,49 +8,64 @@ and saves it as a CSV file for offline analysis.
 
 import os
 import sys
-import pandas as pd
-import requests
 import csv
-from io import StringIO
+
+import instrumentation
+from dedup_qoe_data import dedupe_csv, KEEP_OPTIONS
 
 # Constants
 SHEET_URL = "https://docs.google.com/spreadsheets/d/1wkFZdvLvl3PAcP27EmAKaS_LQTvD1_lsRDko-4I3-LY/export?format=csv&gid=625363607"
 OUTPUT_FILE = "qoe_data.csv"
 
-def download_sheet_as_csv(url, output_file):
+def download_sheet_as_csv(url, output_file, dedup_keep='first'):
     """
     Download a Google Sheet as CSV.
     
     Args:
         url (str): URL to the Google Sheet export
         output_file (str): Path to save the CSV file
+        dedup_keep (str): Remove duplicate submissions, keeping the "first" or "last"
+            row of each; None keeps every row
     
     Returns:
         bool: True if successful, False otherwise
     """
+    import requests
+
     try:
-        print(f"Downloading data from Google Sheet...")
-        response = requests.get(url)
-        response.raise_for_status()  # Raise an exception for HTTP errors
+        with instrumentation.stage('download') as record:
+            print(f"Downloading data from Google Sheet...")
+            response = requests.get(url)
+            response.raise_for_status()  # Raise an exception for HTTP errors
         
-        # Save the CSV content to a file
-        with open(output_file, 'w', newline='', encoding='utf-8') as f:
-            f.write(response.text)
+            # Save the CSV content to a file
+            with open(output_file, 'w', newline='', encoding='utf-8') as f:
+                f.write(response.text)
         
-        # Verify the file was created and has content
-        if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
-            print(f"Data successfully saved to {output_file}")
+            # Verify the file was created and has content
+            if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
+                print(f"Data successfully saved to {output_file}")
             
-            # Count rows in the CSV file
-            with open(output_file, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                row_count = sum(1 for row in reader) - 1  # Subtract 1 for header
+                row_count = None
+                if dedup_keep:
+                    # Drop resubmitted evaluations (double-clicks, retries)
+                    try:
+                        row_count, dropped = dedupe_csv(output_file, keep=dedup_keep)
+                        print(f"Removed {dropped} duplicate submissions")
+                    except ValueError as e:
+                        print(f"Warning: duplicate submissions were not removed: {e}")
+                if row_count is None:
+                    # Count rows in the CSV file
+                    with open(output_file, 'r', encoding='utf-8') as f:
+                        reader = csv.reader(f)
+                        row_count = sum(1 for row in reader) - 1  # Subtract 1 for header
             
-            print(f"Downloaded {row_count} records")
-            return True
-        else:
-            print(f"Error: Failed to save data to {output_file}")
-            return False
+                record['rows'] = row_count
+                print(f"Downloaded {row_count} records")
+                return True
+            else:
+                print(f"Error: Failed to save data to {output_file}")
+                return False
     
     except requests.exceptions.RequestException as e:
         print(f"Error downloading data: {e}")
@@ -66,12 +81,17 @@ def main():
     parser = argparse.ArgumentParser(description='Download QoE data from Google Sheet.')
     parser.add_argument('--output', type=str, default=OUTPUT_FILE, 
                         help=f'Output CSV file (default: {OUTPUT_FILE})')
+    parser.add_argument('--dedup', choices=KEEP_OPTIONS + ['none'], default='first',
+                        help='Keep the first or last row of duplicate submissions, or none to keep all rows (default: first)')
+    instrumentation.add_arguments(parser)
     args = parser.parse_args()
     
     print("QoE Data Downloader")
     print("------------------")
     
-    success = download_sheet_as_csv(SHEET_URL, args.output)
+    with instrumentation.from_arguments(args):
+        dedup_keep = None if args.dedup == 'none' else args.dedup
+        success = download_sheet_as_csv(SHEET_URL, args.output, dedup_keep)
     
     if success:
         print("\nNext steps:")
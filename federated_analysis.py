@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Multi-Study QoE Analysis
+
+Each study wave has its own response export and video-list version. This script takes
+any number of exports (CSV files, directories of CSV files or glob patterns) and analyzes
+each one in a worker process with the same analyze_data used by analyze_qoe_data.py.
+Each worker returns only small count tables:
+
+- responses and correct guesses per (Video List Hash, Reality, User Guess)
+- responses and correct guesses per (Video List Hash, User ID)
+
+These partial counts are summed into combined results and into per-study results keyed
+by Video List Hash, so the raw rows of different exports are never held in one
+DataFrame. The combined and per-study results have the same shape as the output of
+analyze_data, so generate_visualizations and write_dashboard_data can render them.
+
+Usage:
+    python federated_analysis.py exports/
+    python federated_analysis.py "exports/wave_*.csv" --per-study --format both
+    python federated_analysis.py wave1.csv wave2.csv --save-table studies.csv --workers 4
+"""
+
+import argparse
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import instrumentation
+from analyze_qoe_data import (
+    analyze_data, generate_visualizations, segment_counts, write_dashboard_data, OUTPUT_FORMATS
+)
+
+# Constants
+STUDY_COLUMN = 'Video List Hash'
+UNKNOWN_STUDY = 'Unknown'
+REALITY_CATEGORIES = ['Video A is Real', 'Video B is Real', 'Both are Real', 'None are Real']
+# Columns analyze_data reads (matched case-insensitively by substring, like analyze_data)
+USED_COLUMNS = ['timestamp', 'user id', 'scene', 'video a filename', 'video b filename',
+                'video a score', 'video b score', 'which video real', 'video list hash']
+
+def expand_sources(sources):
+    """
+    Expand directories and glob patterns into a sorted list of CSV files.
+
+    Args:
+        sources (list): CSV files, directories or glob patterns
+
+    Returns:
+        list: Unique CSV file paths
+    """
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            paths.extend(glob.glob(os.path.join(source, '*.csv')))
+        elif glob.has_magic(source):
+            paths.extend(glob.glob(source))
+        else:
+            paths.append(source)
+    return sorted(set(paths))
+
+def aggregate_export(path):
+    """
+    Analyze one export and reduce it to count tables.
+
+    Runs in a worker process. Errors are returned rather than raised, so one broken
+    export does not stop the others.
+
+    Args:
+        path (str): Path to the CSV export
+
+    Returns:
+        dict: Path, number of rows, and the "segments" and "users" count tables, or the
+            path and an "error" message
+    """
+    try:
+        with instrumentation.stage('federated:aggregate') as record:
+            df = pd.read_csv(path, dtype={STUDY_COLUMN: str, 'User ID': str},
+                             usecols=lambda col: any(name in col.lower() for name in USED_COLUMNS))
+            if STUDY_COLUMN not in df.columns:
+                df[STUDY_COLUMN] = UNKNOWN_STUDY
+            df = analyze_data(df)['df']
+            df[STUDY_COLUMN] = df[STUDY_COLUMN].fillna(UNKNOWN_STUDY)
+
+            segments = segment_counts(df, ['Reality', 'User Guess', STUDY_COLUMN])
+            users = (df.groupby([STUDY_COLUMN, 'User ID'])['Correct Guess']
+                       .agg(['size', 'sum'])
+                       .reset_index())
+            record['rows'] = len(df)
+        return {'path': path, 'rows': len(df), 'segments': segments, 'users': users}
+    except KeyError as e:
+        return {'path': path, 'error': f"missing column {e}"}
+    except Exception as e:
+        return {'path': path, 'error': str(e)}
+
+def results_from_counts(segments, users):
+    """
+    Build analysis results from count tables.
+
+    Args:
+        segments (pandas.DataFrame): Counts per (Reality, User Guess, ...), with "size"
+            and "sum" columns
+        users (pandas.DataFrame): Counts per User ID, with "size" and "sum" columns
+
+    Returns:
+        dict: overall_accuracy, accuracy_by_type, accuracy_by_user, confusion_matrix and
+            segments, as returned by analyze_data (without the raw "df")
+    """
+    total = segments['size'].sum()
+    overall_accuracy = segments['sum'].sum() / total if total else float('nan')
+
+    by_type = segments.groupby('Reality')[['size', 'sum']].sum()
+    accuracy_by_type = (by_type['sum'] / by_type['size']).to_dict()
+
+    per_user = users.groupby('User ID')[['size', 'sum']].sum()
+    accuracy_by_user = (per_user['sum'] / per_user['size']).rename('Correct Guess')
+
+    # Normalize over every guess (including "Unknown") before keeping the known categories,
+    # exactly like the crosstab in analyze_data
+    counts = segments.pivot_table(index='Reality', columns='User Guess', values='size',
+                                  aggfunc='sum', fill_value=0)
+    confusion_matrix = counts.div(counts.sum(axis=1), axis=0)
+    confusion_matrix = confusion_matrix.reindex(index=REALITY_CATEGORIES, columns=REALITY_CATEGORIES,
+                                                fill_value=0)
+
+    return {
+        'overall_accuracy': overall_accuracy,
+        'accuracy_by_type': accuracy_by_type,
+        'accuracy_by_user': accuracy_by_user,
+        'confusion_matrix': confusion_matrix,
+        'segments': segments
+    }
+
+def merge_partials(partials):
+    """
+    Merge the count tables of all exports into combined and per-study results.
+
+    Args:
+        partials (list): Successful outputs of aggregate_export
+
+    Returns:
+        tuple: (combined results, dict of per-study results keyed by Video List Hash)
+    """
+    dimensions = ['Reality', 'User Guess', STUDY_COLUMN]
+    segments = (pd.concat([p['segments'] for p in partials], ignore_index=True)
+                  .groupby(dimensions, sort=True)[['size', 'sum']].sum()
+                  .reset_index())
+    users = (pd.concat([p['users'] for p in partials], ignore_index=True)
+               .groupby([STUDY_COLUMN, 'User ID'])[['size', 'sum']].sum()
+               .reset_index())
+
+    combined = results_from_counts(segments, users)
+    studies = {
+        study: results_from_counts(segments[segments[STUDY_COLUMN] == study].reset_index(drop=True),
+                                   users[users[STUDY_COLUMN] == study])
+        for study in segments[STUDY_COLUMN].unique()
+    }
+    return combined, studies
+
+def study_table(studies, partials):
+    """
+    Summarize each study in one row.
+
+    Args:
+        studies (dict): Per-study results from merge_partials
+        partials (list): Successful outputs of aggregate_export
+
+    Returns:
+        pandas.DataFrame: Exports, responses, users, overall accuracy and accuracy by
+            video type per study
+    """
+    exports = {}
+    for partial in partials:
+        for study in partial['segments'][STUDY_COLUMN].unique():
+            exports[study] = exports.get(study, 0) + 1
+
+    rows = []
+    for study, results in studies.items():
+        row = {
+            STUDY_COLUMN: study,
+            'Exports': exports.get(study, 0),
+            'Responses': int(results['segments']['size'].sum()),
+            'Users': len(results['accuracy_by_user']),
+            'Accuracy': results['overall_accuracy']
+        }
+        row.update({reality: results['accuracy_by_type'].get(reality, float('nan'))
+                    for reality in REALITY_CATEGORIES})
+        rows.append(row)
+    return pd.DataFrame(rows).set_index(STUDY_COLUMN).sort_index()
+
+def write_outputs(results, output_dir, output_format):
+    """Render charts and/or dashboard data for one set of results."""
+    if output_format in ('png', 'both'):
+        generate_visualizations(results, output_dir)
+    if output_format in ('json', 'both'):
+        write_dashboard_data(results, output_dir)
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description='Analyze many QoE exports in parallel and merge the results.')
+    parser.add_argument('sources', nargs='+', help='CSV exports, directories of CSV files, or glob patterns')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: number of CPUs)')
+    parser.add_argument('--output', type=str, default='visualizations',
+                        help='Directory to save the combined visualizations')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='png',
+                        help='Render PNG charts, write dashboard JSON for dashboard.html, or both (default: png)')
+    parser.add_argument('--per-study', action='store_true',
+                        help='Also write outputs for each study to <output>/study_<Video List Hash>')
+    parser.add_argument('--save-table', type=str, help='Save the per-study summary to this CSV file')
+    parser.add_argument('--no-plot', action='store_true', help='Do not write any charts or dashboard data')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+
+    print("Multi-Study QoE Analysis")
+    print("------------------------")
+
+    paths = expand_sources(args.sources)
+    if not paths:
+        print("Error: no CSV exports found")
+        sys.exit(1)
+    print(f"Analyzing {len(paths)} exports...")
+
+    with instrumentation.from_arguments(args):
+        if args.workers == 1 or len(paths) == 1:
+            outputs = [aggregate_export(path) for path in paths]
+        else:
+            with ProcessPoolExecutor(max_workers=args.workers) as executor:
+                outputs = list(executor.map(aggregate_export, paths))
+
+        partials = []
+        for output in outputs:
+            if 'error' in output:
+                print(f"  {output['path']}: skipped ({output['error']})")
+            else:
+                print(f"  {output['path']}: {output['rows']} responses")
+                partials.append(output)
+        if not partials:
+            print("Error: no export could be analyzed")
+            sys.exit(1)
+
+        with instrumentation.stage('federated:merge'):
+            combined, studies = merge_partials(partials)
+            table = study_table(studies, partials)
+
+        print(f"\nCombined: {int(combined['segments']['size'].sum())} responses from "
+              f"{len(combined['accuracy_by_user'])} users in {len(studies)} studies")
+        print(f"Overall accuracy: {combined['overall_accuracy']:.2%}")
+        print("\nAccuracy by video type:")
+        for video_type, accuracy in combined['accuracy_by_type'].items():
+            print(f"  {video_type}: {accuracy:.2%}")
+        print("\nPer-study results:")
+        with pd.option_context('display.width', 200, 'display.max_columns', 20):
+            print(table.to_string(float_format=lambda x: f"{x:.2%}"))
+
+        if args.save_table:
+            table.to_csv(args.save_table)
+            print(f"\nPer-study summary saved to {args.save_table}")
+
+        if not args.no_plot:
+            print("\nWriting combined outputs...")
+            write_outputs(combined, args.output, args.format)
+            if args.per_study:
+                for study, results in studies.items():
+                    write_outputs(results, os.path.join(args.output, f"study_{study}"), args.format)
+
+if __name__ == "__main__":
+    main()
@@ -53,8 +53,17 @@ def generate_timestamp():
     dt = now - datetime.timedelta(days=days_ago, minutes=minutes_ago)
     return dt.isoformat()
 
-def generate_sample_data():
-    """Generate sample QoE assessment data."""
+def generate_sample_data(num_users=NUM_USERS, num_evaluations_per_user=NUM_EVALUATIONS_PER_USER):
+    """
+    Generate sample QoE assessment data.
+    
+    Args:
+        num_users (int): Number of simulated participants
+        num_evaluations_per_user (int): Number of video pairs evaluated by each participant
+        
+    Returns:
+        list: Rows of the CSV file, starting with the header
+    """
     data = []
     
     # Add header row
@@ -72,10 +81,10 @@ def generate_sample_data():
     data.append(header)
     
     # Generate data for each user
-    for _ in range(NUM_USERS):
+    for _ in range(num_users):
         user_id = generate_user_id()
         
-        for i in range(NUM_EVALUATIONS_PER_USER):
+        for i in range(num_evaluations_per_user):
             # Randomly select videos
             video_a = random.choice(REAL_VIDEOS + SYNTHETIC_VIDEOS)
             # Make sure video B is different from video A
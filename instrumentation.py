@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Pipeline Instrumentation
+
+Shared helpers that record wall time, rows processed and peak memory for each stage
+of the analysis scripts (download, parse, analysis, each chart, pair generation) and
+emit them as JSON lines. Recording is disabled until a metrics destination is set,
+either with the --metrics option of the scripts or the QOE_METRICS_FILE environment
+variable ("-" writes to stderr).
+
+The --profile option wraps a whole run in cProfile or tracemalloc and writes the
+reports next to the given output prefix.
+"""
+
+import contextlib
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Constants
+METRICS_ENV_VAR = 'QOE_METRICS_FILE'
+PROFILE_MODES = ['cprofile', 'tracemalloc']
+DEFAULT_PROFILE_PREFIX = 'profile'
+REPORT_LINES = 30
+CLEAR_REFS_FILE = '/proc/self/clear_refs'
+STATUS_FILE = '/proc/self/status'
+
+_metrics_path = os.environ.get(METRICS_ENV_VAR)
+_open_stages = []  # Highest peak RSS reported by the nested stages of each running stage
+
+def configure(metrics_path):
+    """
+    Set where stage metrics are written.
+
+    Args:
+        metrics_path (str): JSON lines file to append to, "-" for stderr, or None to disable
+    """
+    global _metrics_path
+    _metrics_path = metrics_path
+
+def enabled():
+    """Return True if stage metrics are being recorded."""
+    return bool(_metrics_path)
+
+def peak_rss_kb():
+    """Return the peak resident set size of the process so far in KiB, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports kilobytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def reset_peak_rss():
+    """
+    Reset the peak resident set size of the process to its current size.
+
+    Writing "5" to /proc/self/clear_refs resets VmHWM (Linux 4.0+).
+
+    Returns:
+        bool: True if the peak was reset, False where this is not supported
+    """
+    try:
+        with open(CLEAR_REFS_FILE, 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def read_peak_rss_kb():
+    """Return VmHWM (peak RSS since the last reset) in KiB, or None if unavailable."""
+    try:
+        with open(STATUS_FILE, 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def emit(record):
+    """Write a single metrics record as a JSON line."""
+    line = json.dumps(record, default=str)
+    if _metrics_path == '-':
+        print(line, file=sys.stderr)
+    else:
+        with open(_metrics_path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+@contextlib.contextmanager
+def stage(name, rows=None):
+    """
+    Measure a stage and emit its metrics when it finishes.
+
+    The yielded dict can be updated inside the block, e.g. to set the number of rows
+    once it is known.
+
+    Args:
+        name (str): Stage name, e.g. "parse" or "plot:confusion_matrix"
+        rows (int): Number of rows processed, if known up front
+
+    Yields:
+        dict: The metrics record for the stage
+    """
+    record = {'stage': name, 'rows': rows}
+    if not enabled():
+        yield record
+        return
+
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    per_stage = reset_peak_rss()
+    _open_stages.append(0)
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException:
+        record['status'] = 'error'
+        raise
+    else:
+        record['status'] = 'ok'
+    finally:
+        record['wall_seconds'] = round(time.perf_counter() - start, 6)
+        nested_peak = _open_stages.pop()
+        peak = read_peak_rss_kb() if per_stage else None
+        if peak is not None:
+            # A nested stage resets the peak too, so fold in what it measured
+            peak = max(peak, nested_peak)
+            record['peak_rss_kb'] = peak
+            if _open_stages:
+                _open_stages[-1] = max(_open_stages[-1], peak)
+        else:
+            # No per-stage reset here: the peak covers the whole process so far
+            record['process_peak_rss_kb'] = peak_rss_kb()
+        if tracemalloc.is_tracing():
+            record['traced_peak_kb'] = tracemalloc.get_traced_memory()[1] // 1024
+        record['timestamp'] = time.time()
+        emit(record)
+
+def instrumented(name, rows=None):
+    """
+    Decorator that runs a function inside stage().
+
+    Args:
+        name (str): Stage name
+        rows (callable): Optional function mapping the return value to a row count
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name) as record:
+                result = func(*args, **kwargs)
+                if rows is not None and enabled():
+                    try:
+                        record['rows'] = rows(result)
+                    except Exception:
+                        pass  # Metrics must never break the caller
+                return result
+        return wrapper
+    return decorator
+
+def _write_cprofile_report(profiler, prefix):
+    """Dump raw cProfile stats and a text summary sorted by cumulative time."""
+    import pstats
+
+    profiler.dump_stats(f"{prefix}.prof")
+    with open(f"{prefix}.txt", 'w') as f:
+        stats = pstats.Stats(profiler, stream=f)
+        stats.sort_stats('cumulative').print_stats(REPORT_LINES)
+    print(f"cProfile report saved to {prefix}.prof and {prefix}.txt")
+
+def _write_tracemalloc_report(snapshot, prefix):
+    """Write the source lines that allocated the most memory."""
+    current, peak = tracemalloc.get_traced_memory()
+    with open(f"{prefix}.txt", 'w') as f:
+        f.write(f"Current traced memory: {current / 1024:.1f} KiB\n")
+        f.write(f"Peak traced memory: {peak / 1024:.1f} KiB\n\n")
+        f.write(f"Top {REPORT_LINES} allocations by line:\n")
+        for stat in snapshot.statistics('lineno')[:REPORT_LINES]:
+            f.write(f"{stat}\n")
+    print(f"tracemalloc report saved to {prefix}.txt")
+
+@contextlib.contextmanager
+def profile(mode, prefix=DEFAULT_PROFILE_PREFIX):
+    """
+    Profile the enclosed block with cProfile or tracemalloc.
+
+    Args:
+        mode (str): "cprofile", "tracemalloc" or None to disable profiling
+        prefix (str): Path prefix of the report files
+    """
+    if mode is None:
+        yield
+    elif mode == 'cprofile':
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            _write_cprofile_report(profiler, prefix)
+    elif mode == 'tracemalloc':
+        tracemalloc.start(25)
+        try:
+            yield
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            _write_tracemalloc_report(snapshot, prefix)
+            tracemalloc.stop()
+    else:
+        raise ValueError(f"Unknown profile mode: {mode}")
+
+def add_arguments(parser):
+    """Add the --metrics, --profile and --profile-output options to an argument parser."""
+    parser.add_argument('--metrics', type=str, default=os.environ.get(METRICS_ENV_VAR),
+                        help='Append per-stage metrics as JSON lines to this file ("-" for stderr)')
+    parser.add_argument('--profile', choices=PROFILE_MODES,
+                        help='Profile the run with cProfile or tracemalloc')
+    parser.add_argument('--profile-output', type=str, default=DEFAULT_PROFILE_PREFIX,
+                        help=f'Path prefix for profiling reports (default: {DEFAULT_PROFILE_PREFIX})')
+
+def from_arguments(args):
+    """Apply the parsed instrumentation options and return the profiling context."""
+    configure(args.metrics)
+    return profile(args.profile, args.profile_output)
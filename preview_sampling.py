@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Preview Sampling for QoE Data
+
+Helpers for the --sample preview mode of analyze_qoe_data.py. A quick check during a live
+study does not need every response. It needs a random sample of whole users, because
+the responses of one user are correlated, and an honest error bar on every metric.
+
+The sample is drawn in one streaming pass over the CSV:
+
+- every user gets a pseudo-random priority in (0, 1) from a hash of their ID and a seed
+- for every Video List Hash (the stratum), the users with the smallest priorities are
+  kept (bottom-k sampling), together with all of their rows. Users that fall out of the
+  bottom k are dropped, so memory stays bounded by the sample size, not the file size.
+- the number of users in each stratum is estimated from the k-th smallest priority
+  (a k-minimum-values sketch). A stratum with fewer users than the sample size is kept
+  whole; the remaining sample size is split across the larger strata in proportion to
+  their size, so the sample can exceed the requested size when small strata add up to more.
+
+Metrics are then estimated with the stratified ratio estimator, treating users as
+clusters of responses, and reported with linearized standard errors. A stratum that is
+kept whole contributes no sampling error.
+"""
+
+import csv
+import hashlib
+import heapq
+import io
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+
+# Constants
+USER_COLUMN = 'User ID'
+STRATUM_COLUMN = 'Video List Hash'
+UNKNOWN_STRATUM = 'Unknown'
+MIN_USERS_PER_STRATUM = 2  # Needed to estimate the variance within a stratum
+
+def user_priority(user_id, seed=0):
+    """
+    Map a user ID to a pseudo-random priority in (0, 1).
+
+    Args:
+        user_id (str): User ID
+        seed (int): Sampling seed; a different seed draws a different sample
+
+    Returns:
+        float: The priority
+    """
+    digest = hashlib.blake2b(f"{seed}\x1f{user_id}".encode('utf-8'), digest_size=8).digest()
+    return (int.from_bytes(digest, 'little') + 0.5) / 2 ** 64
+
+def sample_users_from_csv(csv_path, sample_size, seed=0):
+    """
+    Draw a stratified random sample of whole users from a CSV file in one pass.
+
+    Args:
+        csv_path (str): Path to the CSV file
+        sample_size (int): Number of users to sample. Strata with fewer users are kept
+            whole and the rest is split across the larger strata
+        seed (int): Sampling seed
+
+    Returns:
+        tuple: (df, design) where df holds every row of the sampled users, parsed like
+            load_data_from_csv, and design has one row per stratum with the rows
+            scanned, whether the number of users is known or estimated, that number, and
+            the number of sampled users
+    """
+    if sample_size < MIN_USERS_PER_STRATUM:
+        raise ValueError(f"sample size must be at least {MIN_USERS_PER_STRATUM}")
+
+    heaps = {}  # stratum -> max-heap of (-priority, user) holding the k smallest priorities
+    held_rows = {}  # (stratum, user) -> rows of every user currently in a heap
+    rows_scanned = {}
+
+    with instrumentation.stage('sample:scan') as record:
+        with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                raise ValueError(f"{csv_path} is empty")
+            if USER_COLUMN not in header:
+                raise ValueError(f"Missing column in {csv_path}: {USER_COLUMN}")
+            user_index = header.index(USER_COLUMN)
+            stratum_index = header.index(STRATUM_COLUMN) if STRATUM_COLUMN in header else None
+
+            last_user, priority = None, None
+            for row in reader:
+                if not row:
+                    continue
+                user = row[user_index] if user_index < len(row) else ''
+                stratum = UNKNOWN_STRATUM
+                if stratum_index is not None and stratum_index < len(row) and row[stratum_index]:
+                    stratum = row[stratum_index]
+                rows_scanned[stratum] = rows_scanned.get(stratum, 0) + 1
+                # Rows of one user are usually adjacent, so most rows skip the hash
+                if user != last_user:
+                    last_user, priority = user, user_priority(user, seed)
+
+                unit = (stratum, user)
+                if unit in held_rows:
+                    held_rows[unit].append(row)
+                    continue
+                heap = heaps.setdefault(stratum, [])
+                if len(heap) < sample_size:
+                    heapq.heappush(heap, (-priority, user))
+                    held_rows[unit] = [row]
+                elif priority < -heap[0][0]:
+                    # A user that is evicted once can never come back: the threshold only drops
+                    _, evicted = heapq.heapreplace(heap, (-priority, user))
+                    del held_rows[(stratum, evicted)]
+                    held_rows[unit] = [row]
+        record['rows'] = sum(rows_scanned.values())
+
+    # Estimate the users per stratum and allocate the sample. A stratum with fewer users
+    # than the sample size was held completely and is kept whole; the rest of the sample
+    # is split across the larger strata in proportion to their estimated size.
+    held = {stratum: sorted((-neg, user) for neg, user in heap) for stratum, heap in heaps.items()}
+    design = pd.DataFrame(index=pd.Index(sorted(held), name=STRATUM_COLUMN))
+    design['Rows Scanned'] = [rows_scanned[s] for s in design.index]
+    # True when the number of users in the stratum was counted rather than estimated
+    design['Known Size'] = [len(held[s]) < sample_size for s in design.index]
+    design['Population Users'] = [
+        float(len(held[s])) if known else max((sample_size - 1) / held[s][-1][0], float(len(held[s])))
+        for s, known in zip(design.index, design['Known Size'])
+    ]
+    available = np.array([len(held[s]) for s in design.index])
+    large = ~design['Known Size'].to_numpy()
+    allocation = available.copy()
+    if large.any():
+        remaining = max(sample_size - available[~large].sum(), MIN_USERS_PER_STRATUM * large.sum())
+        population = design['Population Users'].to_numpy()[large]
+        share = np.round(remaining * population / population.sum()).astype(int)
+        allocation[large] = np.minimum(np.maximum(MIN_USERS_PER_STRATUM, share), available[large])
+    design['Sampled Users'] = allocation
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for stratum, n in design['Sampled Users'].items():
+        for _, user in held[stratum][:n]:
+            writer.writerows(held_rows[(stratum, user)])
+    buffer.seek(0)
+    df = pd.read_csv(buffer, dtype={USER_COLUMN: str, STRATUM_COLUMN: str})
+    return df, design
+
+def sampling_weights(df, design):
+    """
+    Weight of each sampled row: the users it stands for in its stratum (N_h / n_h).
+
+    Weighted sums of the sampled rows estimate the totals of the full data, and their
+    ratios equal the stratified ratio estimates of stratified_ratio.
+
+    Args:
+        df (pandas.DataFrame): Sampled rows
+        design (pandas.DataFrame): Sample design returned by sample_users_from_csv
+
+    Returns:
+        pandas.Series: Weight of each row, same index as df
+    """
+    stratum = (df[STRATUM_COLUMN] if STRATUM_COLUMN in df.columns
+               else pd.Series(UNKNOWN_STRATUM, index=df.index))
+    per_stratum = design['Population Users'] / design['Sampled Users']
+    return stratum.fillna(UNKNOWN_STRATUM).astype(str).map(per_stratum).astype(float)
+
+def sampled_users(df, design):
+    """
+    Accuracy and weight of every sampled user, for charts of the user distribution.
+
+    Users are keyed by (stratum, user), so a user who answered in two strata is counted
+    once in each, with the weight of that stratum.
+
+    Args:
+        df (pandas.DataFrame): Sampled rows, with a Correct Guess column
+        design (pandas.DataFrame): Sample design returned by sample_users_from_csv
+
+    Returns:
+        pandas.DataFrame: "Accuracy" and "Weight" of each (stratum, user)
+    """
+    stratum = (df[STRATUM_COLUMN] if STRATUM_COLUMN in df.columns
+               else pd.Series(UNKNOWN_STRATUM, index=df.index))
+    keys = [stratum.fillna(UNKNOWN_STRATUM).astype(str).rename(STRATUM_COLUMN),
+            df[USER_COLUMN].fillna('').astype(str).rename(USER_COLUMN)]
+    # The weight is constant within a stratum, so any row of the user carries it
+    return pd.DataFrame({
+        'Accuracy': df['Correct Guess'].groupby(keys).mean(),
+        'Weight': sampling_weights(df, design).groupby(keys).first()
+    })
+
+def stratified_ratio(numerator, denominator, strata, design):
+    """
+    Estimate a ratio of totals (e.g. correct guesses / responses) from a stratified
+    sample of users, with its linearized standard error.
+
+    Args:
+        numerator (pandas.Series): Numerator total of each sampled user
+        denominator (pandas.Series): Denominator total of each sampled user
+        strata (numpy.ndarray): Stratum of each sampled user
+        design (pandas.DataFrame): Sample design returned by sample_users_from_csv
+
+    Returns:
+        tuple: (estimate, standard error); NaN when the denominator is zero
+    """
+    frame = pd.DataFrame({'y': np.asarray(numerator, dtype=float),
+                          'x': np.asarray(denominator, dtype=float),
+                          'h': np.asarray(strata)})
+    means = frame.groupby('h')[['y', 'x']].mean()
+    population = design['Population Users'].reindex(means.index)
+    sampled = design['Sampled Users'].reindex(means.index)
+
+    total_x = (population * means['x']).sum()
+    if total_x == 0:
+        return float('nan'), float('nan')
+    ratio = (population * means['y']).sum() / total_x
+
+    frame['z'] = frame['y'] - ratio * frame['x']
+    variance_z = frame.groupby('h')['z'].var(ddof=1).fillna(0.0)
+    finite_population = (1 - sampled / population).clip(lower=0)
+    variance = (population ** 2 * finite_population * variance_z / sampled).sum() / total_x ** 2
+    return float(ratio), float(np.sqrt(variance))
+
+def estimate_metrics(results, design):
+    """
+    Estimate the metrics of analyze_data from a sample, with standard errors.
+
+    Args:
+        results (dict): analyze_data run on the sampled rows
+        design (pandas.DataFrame): Sample design returned by sample_users_from_csv
+
+    Returns:
+        dict: (estimate, standard error) for overall_accuracy and for each entry of
+            accuracy_by_type, plus confusion_matrix and confusion_matrix_se DataFrames
+    """
+    df = results['df']
+    stratum = (df[STRATUM_COLUMN] if STRATUM_COLUMN in df.columns
+               else pd.Series(UNKNOWN_STRATUM, index=df.index))
+    keys = [stratum.fillna(UNKNOWN_STRATUM).astype(str).rename(STRATUM_COLUMN),
+            df[USER_COLUMN].fillna('').astype(str).rename(USER_COLUMN)]
+
+    # Responses of every sampled user per (Reality, User Guess) cell
+    units = df.groupby(keys + [df['Reality'], df['User Guess']]).size() \
+              .unstack(['Reality', 'User Guess'], fill_value=0)
+    correct = df.groupby(keys)['Correct Guess'].sum().reindex(units.index, fill_value=0)
+    strata = units.index.get_level_values(STRATUM_COLUMN).to_numpy()
+    zeros = pd.Series(0, index=units.index)
+
+    def responses(reality, guess=None):
+        if reality not in units.columns.get_level_values(0):
+            return zeros
+        if guess is None:
+            return units[reality].sum(axis=1)
+        return units[(reality, guess)] if (reality, guess) in units.columns else zeros
+
+    estimates = {
+        'overall_accuracy': stratified_ratio(correct, units.sum(axis=1), strata, design),
+        'accuracy_by_type': {
+            reality: stratified_ratio(responses(reality, reality), responses(reality), strata, design)
+            for reality in results['accuracy_by_type']
+        }
+    }
+
+    matrix = results['confusion_matrix']
+    values = pd.DataFrame(0.0, index=matrix.index, columns=matrix.columns)
+    errors = pd.DataFrame(0.0, index=matrix.index, columns=matrix.columns)
+    for reality in matrix.index:
+        for guess in matrix.columns:
+            estimate, error = stratified_ratio(responses(reality, guess), responses(reality), strata, design)
+            # Like analyze_data, a video type without responses gets a row of zeros
+            values.loc[reality, guess] = 0.0 if np.isnan(estimate) else estimate
+            errors.loc[reality, guess] = 0.0 if np.isnan(error) else error
+    estimates['confusion_matrix'] = values
+    estimates['confusion_matrix_se'] = errors
+    return estimates
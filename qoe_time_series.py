@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+QoE Time Series Analysis
+
+This script tracks accuracy and response rate over the course of a study, to spot
+learning effects and traffic spikes while the study is live. It:
+
+- parses the Timestamp column in one vectorized pass per format. The frontend writes
+  UTC ISO strings ending in "Z", while generate_sample_data.py writes naive ISO strings.
+  Both are normalized to UTC.
+- sorts the responses by time once
+- counts responses, correct guesses and distinct users per hourly or daily bucket
+- computes trailing-window accuracy and response rate with prefix sums and binary search
+  over the sorted times, in O(n log n) for any window length
+- reports accuracy by the position of a response within each user's session
+
+Usage:
+    python qoe_time_series.py --csv qoe_data.csv
+    python qoe_time_series.py --csv qoe_data.csv --freq hour --window 6h --save-table hourly.csv
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+from analyze_qoe_data import load_data, analyze_data
+
+# Constants
+TIMESTAMP_COLUMN = 'Timestamp'
+FREQUENCIES = {'hour': 'h', 'day': 'D'}
+DEFAULT_WINDOWS = {'hour': '6h', 'day': '7D'}
+UTC_SUFFIX = r'Z$'
+OFFSET_SUFFIX = r'[+-]\d{2}:?\d{2}$'
+MAX_SESSION_POSITION = 10
+
+def parse_timestamps(values, naive_timezone='UTC'):
+    """
+    Parse mixed ISO 8601 timestamps and normalize them to UTC.
+
+    Each value is classified by its suffix: "Z", a numeric UTC offset, or none (naive).
+    Each class is then parsed with the ISO 8601 parser in a single call, so pandas never
+    falls back to guessing the format element by element.
+
+    Args:
+        values (pandas.Series): Timestamp strings
+        naive_timezone (str): Time zone that naive timestamps were written in
+
+    Returns:
+        pandas.Series: UTC timestamps (NaT where a value could not be parsed), same index
+    """
+    text = values.astype('string').str.strip()
+    aware = text.str.contains(UTC_SUFFIX, regex=True, na=False) | \
+        text.str.contains(OFFSET_SUFFIX, regex=True, na=False)
+    naive = ~aware & text.notna() & (text != '')
+
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns, UTC]')
+    if aware.any():
+        parsed[aware] = pd.to_datetime(text[aware], format='ISO8601', utc=True, errors='coerce')
+    if naive.any():
+        local = pd.to_datetime(text[naive], format='ISO8601', errors='coerce')
+        parsed[naive] = local.dt.tz_localize(naive_timezone, ambiguous='NaT',
+                                             nonexistent='NaT').dt.tz_convert('UTC')
+    return parsed
+
+def trailing_window_counts(times, values, window, at=None):
+    """
+    Count events and sum values over a trailing time window.
+
+    For every evaluation time t, the window is (t - window, t]. Window bounds are found
+    with a binary search over the sorted times and sums are taken from prefix sums, so
+    the cost does not depend on the window length.
+
+    Args:
+        times (numpy.ndarray): Sorted event times as int64 nanoseconds
+        values (numpy.ndarray): Value of each event (e.g. 1 for a correct guess)
+        window (int): Window length in nanoseconds
+        at (numpy.ndarray): Evaluation times in nanoseconds; defaults to the event times
+
+    Returns:
+        tuple: (counts, sums) arrays, one entry per evaluation time
+    """
+    at = times if at is None else at
+    prefix = np.concatenate(([0.0], np.cumsum(values, dtype=float)))
+    end = np.searchsorted(times, at, side='right')
+    start = np.searchsorted(times, at - window, side='right')
+    return end - start, prefix[end] - prefix[start]
+
+def bucket_statistics(times, correct, users, freq):
+    """
+    Count responses, correct guesses and distinct users per time bucket.
+
+    Args:
+        times (pandas.DatetimeIndex): Sorted UTC response times
+        correct (numpy.ndarray): 1 for a correct guess, 0 otherwise
+        users (numpy.ndarray): Integer user code of each response; -1 for a response
+            without a User ID, which counts as a response but not as a user
+        freq (str): Pandas frequency of the buckets ("h" or "D")
+
+    Returns:
+        pandas.DataFrame: One row per bucket, including empty buckets
+    """
+    step = pd.Timedelta(1, unit=freq).value
+    origin = times[0].floor(freq)
+    codes = (times.asi8 - origin.value) // step
+    num_buckets = int(codes[-1]) + 1
+
+    responses = np.bincount(codes, minlength=num_buckets)
+    correct_counts = np.bincount(codes, weights=correct, minlength=num_buckets)
+    # Distinct (bucket, user) combinations, counted per bucket
+    known = users >= 0
+    base = int(users.max()) + 1 if known.any() else 1
+    combined = np.unique(codes[known] * base + users[known])
+    distinct_users = np.bincount(combined // base, minlength=num_buckets)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        accuracy = correct_counts / responses
+    return pd.DataFrame({
+        'Responses': responses,
+        'Correct': correct_counts.astype(int),
+        'Accuracy': accuracy,
+        'Users': distinct_users
+    }, index=pd.date_range(origin, periods=num_buckets, freq=freq, name='Bucket Start'))
+
+def analyze_time_series(df, freq='day', window=None, naive_timezone='UTC'):
+    """
+    Compute accuracy and response rate over time.
+
+    Args:
+        df (pandas.DataFrame): Output of analyze_data (needs the Timestamp, User ID and
+            Correct Guess columns)
+        freq (str): Bucket size, "hour" or "day"
+        window (str): Trailing window length as a pandas Timedelta string; defaults to
+            DEFAULT_WINDOWS[freq]
+        naive_timezone (str): Time zone that naive timestamps were written in
+
+    Returns:
+        dict: Bucket table, per-response rolling values and accuracy by session position
+    """
+    window = pd.Timedelta(window or DEFAULT_WINDOWS[freq])
+    pandas_freq = FREQUENCIES[freq]
+
+    with instrumentation.stage('time_series:parse', rows=len(df)):
+        times = parse_timestamps(df[TIMESTAMP_COLUMN], naive_timezone)
+        valid = times.notna().to_numpy()
+
+    with instrumentation.stage('time_series:aggregate', rows=int(valid.sum())):
+        times = times[valid]
+        order = np.argsort(times.to_numpy(), kind='stable')
+        times = pd.DatetimeIndex(times.iloc[order]).as_unit('ns')
+        correct = df['Correct Guess'].to_numpy()[valid][order].astype(float)
+        user_ids = df['User ID'].to_numpy()[valid][order]
+        user_codes, _ = pd.factorize(user_ids)  # -1 for a blank User ID
+
+        if len(times) == 0:
+            buckets = pd.DataFrame(columns=['Responses', 'Correct', 'Accuracy', 'Users',
+                                            'Rolling Accuracy', 'Rolling Responses per Hour'])
+            rolling = pd.DataFrame(columns=['User ID', 'Correct Guess', 'Rolling Accuracy'])
+            by_position = pd.DataFrame(columns=['Responses', 'Accuracy'])
+        else:
+            buckets = bucket_statistics(times, correct, user_codes, pandas_freq)
+
+            # Trailing window evaluated at the end of each bucket
+            bucket_ends = (buckets.index + pd.Timedelta(1, unit=pandas_freq)).as_unit('ns').asi8 - 1
+            counts, sums = trailing_window_counts(times.asi8, correct, window.value, bucket_ends)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                buckets['Rolling Accuracy'] = sums / counts
+            buckets['Rolling Responses per Hour'] = counts / (window / pd.Timedelta(hours=1))
+
+            # Trailing window evaluated at every response
+            counts, sums = trailing_window_counts(times.asi8, correct, window.value)
+            rolling = pd.DataFrame({
+                'User ID': user_ids,
+                'Correct Guess': correct.astype(bool),
+                'Rolling Accuracy': sums / counts
+            }, index=times.rename('Timestamp'))
+
+            # Position of each response within its user's session (1 = first answer).
+            # Responses without a User ID belong to no session and are left out
+            known = user_codes >= 0
+            position = pd.Series(user_codes[known]).groupby(user_codes[known]).cumcount().to_numpy() + 1
+            position = np.minimum(position, MAX_SESSION_POSITION)
+            position_counts = np.bincount(position, minlength=MAX_SESSION_POSITION + 1)[1:]
+            position_correct = np.bincount(position, weights=correct[known],
+                                           minlength=MAX_SESSION_POSITION + 1)[1:]
+            labels = [str(p) for p in range(1, MAX_SESSION_POSITION)] + [f"{MAX_SESSION_POSITION}+"]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                by_position = pd.DataFrame({
+                    'Responses': position_counts,
+                    'Accuracy': position_correct / position_counts
+                }, index=pd.Index(labels, name='Session Position'))
+            by_position = by_position[by_position['Responses'] > 0]
+
+    return {
+        'buckets': buckets,
+        'rolling': rolling,
+        'by_position': by_position,
+        'window': window,
+        'freq': freq,
+        'unparsed': int((~valid).sum())
+    }
+
+def plot_trend(results, output_dir='.'):
+    """
+    Plot accuracy and responses per bucket over time.
+
+    Args:
+        results (dict): Output of analyze_time_series
+        output_dir (str): Directory to save the plot
+    """
+    import matplotlib.pyplot as plt
+
+    os.makedirs(output_dir, exist_ok=True)
+    buckets = results['buckets']
+    path = os.path.join(output_dir, 'time_series_trend.png')
+    width = pd.Timedelta(1, unit=FREQUENCIES[results['freq']]) * 0.8
+
+    with instrumentation.stage('plot:time_series_trend'):
+        fig, (top, bottom) = plt.subplots(2, 1, figsize=(12, 8), sharex=True)
+        top.scatter(buckets.index, buckets['Accuracy'], s=np.clip(buckets['Responses'], 5, 100),
+                    color='steelblue', alpha=0.6, label=f"Accuracy per {results['freq']}")
+        top.plot(buckets.index, buckets['Rolling Accuracy'], color='darkorange', linewidth=2,
+                 label=f"Trailing {results['window']} accuracy")
+        top.set_ylim(0, 1)
+        top.set_ylabel('Accuracy', fontsize=12)
+        top.set_title('Accuracy and Responses over Time', fontsize=16)
+        top.legend()
+        bottom.bar(buckets.index, buckets['Responses'], width=width, color='seagreen', align='edge')
+        bottom.set_ylabel(f"Responses per {results['freq']}", fontsize=12)
+        bottom.set_xlabel('Time (UTC)', fontsize=12)
+        fig.autofmt_xdate()
+        plt.tight_layout()
+        plt.savefig(path, dpi=300)
+        plt.close(fig)
+
+    print(f"Trend plot saved to {path}")
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description='Track QoE accuracy and response rate over time.')
+    parser.add_argument('--csv', type=str, help='Path to CSV file with QoE data')
+    parser.add_argument('--output', type=str, default='visualizations', help='Directory to save the trend plot')
+    parser.add_argument('--freq', choices=list(FREQUENCIES), default='day',
+                        help='Bucket size (default: day)')
+    parser.add_argument('--window', type=str,
+                        help='Trailing window, e.g. 6h or 7D (default: 6h for hourly, 7D for daily buckets)')
+    parser.add_argument('--naive-timezone', type=str, default='UTC',
+                        help='Time zone of timestamps without an offset (default: UTC)')
+    parser.add_argument('--save-table', type=str, help='Save the per-bucket table to this CSV file')
+    parser.add_argument('--no-plot', action='store_true', help='Do not generate the trend plot')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+
+    print("QoE Time Series Analysis")
+    print("------------------------")
+
+    with instrumentation.from_arguments(args):
+        df = load_data(args.csv)
+
+        if TIMESTAMP_COLUMN not in df.columns:
+            print(f"Error: missing column: {TIMESTAMP_COLUMN}")
+            sys.exit(1)
+
+        try:
+            results = analyze_time_series(analyze_data(df)['df'], args.freq, args.window, args.naive_timezone)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
+        buckets = results['buckets']
+        if results['unparsed']:
+            print(f"Skipped {results['unparsed']} rows with a missing or unparseable timestamp")
+        if buckets.empty:
+            print("No timestamped responses found")
+            return
+
+        print(f"\n{int(buckets['Responses'].sum())} responses from {buckets.index[0]} to "
+              f"{buckets.index[-1]} in {len(buckets)} {args.freq} buckets")
+        print(f"\nPer-{args.freq} statistics (trailing window: {results['window']}):")
+        with pd.option_context('display.width', 200, 'display.max_rows', 100):
+            print(buckets.to_string(float_format=lambda x: f"{x:.2f}"))
+            print("\nAccuracy by position within a user's session:")
+            print(results['by_position'].to_string(float_format=lambda x: f"{x:.2%}"))
+
+        if args.save_table:
+            buckets.to_csv(args.save_table)
+            print(f"\nBucket table saved to {args.save_table}")
+        if not args.no_plot:
+            plot_trend(results, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Technique Ranking from Paired Comparisons
+
+Every evaluation shows two videos side by side and asks for a 1-5 score for each, so each
+response is a paired comparison: the video with the higher score wins, equal scores are a
+tie. This script counts the comparisons between every pair of distinct video files and
+fits Bradley-Terry strengths to rank the techniques against each other. Uncertainty is
+reported with bootstrap intervals.
+
+All the work after the initial counting is done on the k x k comparison matrix, where k is
+the number of videos, so the fit and the bootstrap cost the same for a thousand rows as
+for millions.
+
+Usage:
+    python rank_techniques.py --csv qoe_data.csv
+    python rank_techniques.py --csv qoe_data.csv --bootstrap 1000 --save-table ranking.csv
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+import instrumentation
+from analyze_qoe_data import load_data
+
+# Constants
+VIDEO_COLUMNS = ['Video A Filename', 'Video B Filename']
+SCORE_COLUMNS = ['Video A Score', 'Video B Score']
+DEFAULT_BOOTSTRAP = 200
+DEFAULT_PRIOR = 0.5  # Virtual tie between every pair of videos, keeps strengths finite
+CONFIDENCE = 0.95
+MAX_ITERATIONS = 10000
+TOLERANCE = 1e-9
+
+def build_comparison_matrices(df):
+    """
+    Count wins and ties between every pair of videos.
+
+    Args:
+        df (pandas.DataFrame): Responses with video filename and score columns
+
+    Returns:
+        tuple: (videos, wins, ties) where videos is the list of filenames, wins[i, j] is
+            the number of times video i scored higher than video j and ties[i, j] (i < j)
+            is the number of equal scores. Both matrices are scipy.sparse CSR matrices.
+    """
+    # One factorize over both filename columns gives consistent codes for A and B
+    names = pd.concat([df[VIDEO_COLUMNS[0]], df[VIDEO_COLUMNS[1]]], ignore_index=True)
+    codes, videos = pd.factorize(names)
+    code_a, code_b = codes[:len(df)], codes[len(df):]
+    score_a = pd.to_numeric(df[SCORE_COLUMNS[0]], errors='coerce').to_numpy()
+    score_b = pd.to_numeric(df[SCORE_COLUMNS[1]], errors='coerce').to_numpy()
+
+    valid = (code_a >= 0) & (code_b >= 0) & (code_a != code_b) & ~np.isnan(score_a) & ~np.isnan(score_b)
+    code_a, code_b = code_a[valid], code_b[valid]
+    score_a, score_b = score_a[valid], score_b[valid]
+
+    k = len(videos)
+    a_wins = score_a > score_b
+    b_wins = score_b > score_a
+    tied = ~(a_wins | b_wins)
+    winner = np.concatenate([code_a[a_wins], code_b[b_wins]])
+    loser = np.concatenate([code_b[a_wins], code_a[b_wins]])
+    # Duplicate (row, col) entries are summed when converting from COO
+    wins = sparse.coo_matrix((np.ones(len(winner)), (winner, loser)), shape=(k, k)).tocsr()
+    tie_lo = np.minimum(code_a[tied], code_b[tied])
+    tie_hi = np.maximum(code_a[tied], code_b[tied])
+    ties = sparse.coo_matrix((np.ones(len(tie_lo)), (tie_lo, tie_hi)), shape=(k, k)).tocsr()
+    return list(videos), wins, ties
+
+def fit_bradley_terry(wins, ties, prior=DEFAULT_PRIOR, max_iterations=MAX_ITERATIONS, tol=TOLERANCE):
+    """
+    Fit Bradley-Terry strengths with the vectorized MM algorithm (Hunter, 2004).
+
+    Ties count as half a win for each video. A small prior adds a virtual tie between
+    every pair of videos, so videos that never won still get a finite strength and
+    videos that were never compared directly are still connected.
+
+    Args:
+        wins: k x k matrix (dense or sparse) of wins of row over column
+        ties: k x k upper-triangular matrix (dense or sparse) of ties
+        prior (float): Number of virtual ties added between every pair of videos; must be
+            positive, or a video without wins would get a strength of zero
+        max_iterations (int): Maximum number of MM iterations
+        tol (float): Convergence threshold on the change in log-strength
+
+    Returns:
+        numpy.ndarray: Log-strengths, centered at zero
+    """
+    wins = wins.toarray() if sparse.issparse(wins) else np.asarray(wins, dtype=float)
+    ties = ties.toarray() if sparse.issparse(ties) else np.asarray(ties, dtype=float)
+    k = wins.shape[0]
+    if prior <= 0:
+        raise ValueError("prior must be positive")
+    if k < 2:
+        return np.zeros(k)
+    off_diagonal = 1.0 - np.eye(k)
+    effective_wins = wins + 0.5 * (ties + ties.T) + 0.5 * prior * off_diagonal
+    comparisons = effective_wins + effective_wins.T
+    total_wins = effective_wins.sum(axis=1)
+
+    log_strength = np.zeros(k)
+    for _ in range(max_iterations):
+        strength = np.exp(log_strength)
+        denominator = (comparisons / (strength[:, None] + strength[None, :])).sum(axis=1)
+        new_log_strength = np.log(total_wins / denominator)
+        new_log_strength -= new_log_strength.mean()
+        converged = np.max(np.abs(new_log_strength - log_strength)) < tol
+        log_strength = new_log_strength
+        if converged:
+            break
+    return log_strength
+
+def bootstrap_intervals(wins, ties, n_bootstrap=DEFAULT_BOOTSTRAP, prior=DEFAULT_PRIOR,
+                        confidence=CONFIDENCE, seed=None):
+    """
+    Bootstrap confidence intervals for the Bradley-Terry log-strengths.
+
+    Resampling responses with replacement is equivalent to drawing the win and tie counts
+    from a multinomial distribution over the observed outcome cells, so each replicate
+    costs O(k^2) no matter how many responses there are.
+
+    Args:
+        wins: k x k matrix of wins
+        ties: k x k upper-triangular matrix of ties
+        n_bootstrap (int): Number of bootstrap replicates
+        prior (float): Virtual ties added between every pair of videos
+        confidence (float): Confidence level of the intervals
+        seed (int): Random seed for reproducible intervals
+
+    Returns:
+        tuple: (lower, upper) arrays of log-strength bounds
+    """
+    wins = wins.toarray() if sparse.issparse(wins) else np.asarray(wins, dtype=float)
+    ties = ties.toarray() if sparse.issparse(ties) else np.asarray(ties, dtype=float)
+    k = wins.shape[0]
+    cells = np.concatenate([wins.ravel(), ties.ravel()])
+    total = int(cells.sum())
+    if total == 0 or n_bootstrap <= 0:
+        nan = np.full(k, np.nan)
+        return nan, nan.copy()
+
+    rng = np.random.default_rng(seed)
+    samples = rng.multinomial(total, cells / total, size=n_bootstrap)
+    replicates = np.empty((n_bootstrap, k))
+    for i, sample in enumerate(samples):
+        replicates[i] = fit_bradley_terry(sample[:k * k].reshape(k, k),
+                                          sample[k * k:].reshape(k, k), prior)
+    alpha = (1 - confidence) / 2
+    lower, upper = np.quantile(replicates, [alpha, 1 - alpha], axis=0)
+    return lower, upper
+
+def rank_techniques(df, n_bootstrap=DEFAULT_BOOTSTRAP, prior=DEFAULT_PRIOR, seed=None):
+    """
+    Rank the videos in the responses by Bradley-Terry strength.
+
+    Args:
+        df (pandas.DataFrame): Responses with video filename and score columns
+        n_bootstrap (int): Number of bootstrap replicates for the intervals
+        prior (float): Virtual ties added between every pair of videos
+        seed (int): Random seed for the bootstrap
+
+    Returns:
+        pandas.DataFrame: One row per video, strongest first
+    """
+    with instrumentation.stage('rank:count', rows=len(df)):
+        videos, wins, ties = build_comparison_matrices(df)
+    with instrumentation.stage('rank:fit'):
+        log_strength = fit_bradley_terry(wins, ties, prior)
+    with instrumentation.stage('rank:bootstrap'):
+        lower, upper = bootstrap_intervals(wins, ties, n_bootstrap, prior, seed=seed)
+
+    n_wins = np.asarray(wins.sum(axis=1)).ravel()
+    n_losses = np.asarray(wins.sum(axis=0)).ravel()
+    n_ties = np.asarray(ties.sum(axis=1)).ravel() + np.asarray(ties.sum(axis=0)).ravel()
+    comparisons = n_wins + n_losses + n_ties
+    with np.errstate(invalid='ignore', divide='ignore'):
+        win_rate = (n_wins + 0.5 * n_ties) / comparisons
+
+    table = pd.DataFrame({
+        'Video': videos,
+        'Strength': log_strength,
+        'CI Lower': lower,
+        'CI Upper': upper,
+        'Wins': n_wins.astype(int),
+        'Losses': n_losses.astype(int),
+        'Ties': n_ties.astype(int),
+        'Comparisons': comparisons.astype(int),
+        'Win Rate': win_rate
+    })
+    table = table.sort_values('Strength', ascending=False, ignore_index=True)
+    table.insert(0, 'Rank', np.arange(1, len(table) + 1))
+    return table
+
+def plot_ranking(table, output_dir='.'):
+    """
+    Plot the Bradley-Terry strengths with their bootstrap intervals.
+
+    Args:
+        table (pandas.DataFrame): Output of rank_techniques
+        output_dir (str): Directory to save the plot
+    """
+    import matplotlib.pyplot as plt
+
+    os.makedirs(output_dir, exist_ok=True)
+    # Strongest video at the top
+    ordered = table.iloc[::-1]
+    labels = [os.path.basename(v) for v in ordered['Video']]
+    errors = None
+    if ordered['CI Lower'].notna().all():
+        errors = np.vstack([
+            (ordered['Strength'] - ordered['CI Lower']).clip(lower=0),
+            (ordered['CI Upper'] - ordered['Strength']).clip(lower=0)
+        ])
+
+    with instrumentation.stage('plot:technique_ranking'):
+        plt.figure(figsize=(12, max(4, 0.6 * len(table) + 2)))
+        plt.barh(labels, ordered['Strength'], xerr=errors, color='#3498db', capsize=4,
+                 label=f'Bradley-Terry strength ({CONFIDENCE:.0%} bootstrap interval)')
+        plt.axvline(0, color='gray', linewidth=1)
+        plt.title('Ranking of Techniques from Paired Comparisons', fontsize=16)
+        plt.xlabel('Log-Strength (0 = average video)', fontsize=14)
+        plt.ylabel('Video', fontsize=14)
+        plt.legend(loc='lower right')
+        plt.tight_layout()
+        plt.savefig(os.path.join(output_dir, 'technique_ranking.png'), dpi=300)
+        plt.close()
+
+    print(f"Ranking plot saved to {os.path.join(output_dir, 'technique_ranking.png')}")
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description='Rank video techniques with a Bradley-Terry model.')
+    parser.add_argument('--csv', type=str, help='Path to CSV file with QoE data')
+    parser.add_argument('--output', type=str, default='visualizations',
+                        help='Directory to save the ranking plot')
+    parser.add_argument('--bootstrap', type=int, default=DEFAULT_BOOTSTRAP,
+                        help=f'Number of bootstrap replicates (default: {DEFAULT_BOOTSTRAP})')
+    parser.add_argument('--prior', type=float, default=DEFAULT_PRIOR,
+                        help=f'Virtual ties between every pair of videos, must be positive (default: {DEFAULT_PRIOR})')
+    parser.add_argument('--seed', type=int, help='Random seed for the bootstrap')
+    parser.add_argument('--save-table', type=str, help='Save the ranked table to a CSV file')
+    parser.add_argument('--no-plot', action='store_true', help='Do not generate the ranking plot')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    if args.prior <= 0:
+        print("Error: --prior must be positive")
+        sys.exit(1)
+
+    print("Technique Ranking")
+    print("-----------------")
+
+    with instrumentation.from_arguments(args):
+        df = load_data(args.csv)
+
+        missing = [col for col in VIDEO_COLUMNS + SCORE_COLUMNS if col not in df.columns]
+        if missing:
+            print(f"Error: missing columns: {', '.join(missing)}")
+            sys.exit(1)
+
+        table = rank_techniques(df, args.bootstrap, args.prior, args.seed)
+
+        print(f"\nRanked {len(table)} videos from {int(table['Comparisons'].sum() // 2)} comparisons:\n")
+        with pd.option_context('display.max_colwidth', 60, 'display.width', 200):
+            print(table.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+
+        if args.save_table:
+            table.to_csv(args.save_table, index=False)
+            print(f"\nRanked table saved to {args.save_table}")
+        if not args.no_plot:
+            plot_ranking(table, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Rater Normalization and Agreement Statistics
+
+Participants use the 1-5 scale differently: lenient raters give mostly 4s and 5s, harsh
+raters mostly 1s and 2s. This script puts the raw Video A/B scores on a common scale and
+checks how reliable the raters are:
+
+- z-scores every rating against the mean and standard deviation of its rater
+- screens out inconsistent raters with the ITU-R BT.500 procedure
+- measures inter-rater agreement with Krippendorff's alpha (interval metric)
+- reports the mean opinion score (MOS) of every video before and after normalization
+
+Everything is computed with NumPy over integer codes for users and videos (bincount
+and fancy indexing), with no Python loop over users, so it scales to hundreds of
+thousands of participants.
+
+Usage:
+    python rater_statistics.py --csv qoe_data.csv
+    python rater_statistics.py --csv qoe_data.csv --save-raters raters.csv --save-ratings ratings.csv
+"""
+
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+from analyze_qoe_data import load_data
+
+# Constants
+USER_COLUMN = 'User ID'
+VIDEO_COLUMNS = ['Video A Filename', 'Video B Filename']
+SCORE_COLUMNS = ['Video A Score', 'Video B Score']
+REJECT_RATIO = 0.05  # BT.500: share of outlying ratings above which a rater may be rejected
+SYMMETRY_RATIO = 0.3  # BT.500: outliers must be spread on both sides of the mean
+MIN_RATINGS = 2  # Raters with fewer ratings cannot be normalized
+
+def extract_ratings(df):
+    """
+    Stack the Video A and Video B scores into one rating per (user, video).
+
+    Args:
+        df (pandas.DataFrame): Responses with user, video filename and score columns
+
+    Returns:
+        dict: Integer codes for users and videos, float scores, and the user and video
+            labels the codes refer to. Ratings without a numeric score are dropped.
+    """
+    user_codes, users = pd.factorize(df[USER_COLUMN])
+    videos = pd.concat([df[VIDEO_COLUMNS[0]], df[VIDEO_COLUMNS[1]]], ignore_index=True)
+    video_codes, video_labels = pd.factorize(videos)
+    scores = np.concatenate([
+        pd.to_numeric(df[SCORE_COLUMNS[0]], errors='coerce').to_numpy(dtype=float),
+        pd.to_numeric(df[SCORE_COLUMNS[1]], errors='coerce').to_numpy(dtype=float)
+    ])
+    user_codes = np.concatenate([user_codes, user_codes])
+
+    valid = (user_codes >= 0) & (video_codes >= 0) & ~np.isnan(scores)
+    return {
+        'user': user_codes[valid],
+        'video': video_codes[valid],
+        'score': scores[valid],
+        'users': np.asarray(users),
+        'videos': np.asarray(video_labels)
+    }
+
+def group_moments(codes, values, n_groups):
+    """
+    Count, mean and sample standard deviation of values per group.
+
+    Args:
+        codes (numpy.ndarray): Group code of each value
+        values (numpy.ndarray): Values
+        n_groups (int): Number of groups
+
+    Returns:
+        tuple: (count, mean, std) arrays of length n_groups; std is NaN for groups with
+            fewer than two values
+    """
+    count = np.bincount(codes, minlength=n_groups).astype(float)
+    total = np.bincount(codes, weights=values, minlength=n_groups)
+    total_sq = np.bincount(codes, weights=values * values, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        variance = (total_sq - count * mean * mean) / (count - 1)
+    std = np.sqrt(np.clip(variance, 0, None))
+    std[count < 2] = np.nan
+    return count, mean, std
+
+def zscore_by_rater(user_codes, scores, n_users):
+    """
+    Z-score every rating against the mean and standard deviation of its rater.
+
+    Raters with fewer than MIN_RATINGS ratings or with no spread in their scores carry no
+    information about their own scale, so their ratings get a z-score of NaN and are left
+    out of the normalized statistics.
+
+    Args:
+        user_codes (numpy.ndarray): User code of each rating
+        scores (numpy.ndarray): Raw scores
+        n_users (int): Number of users
+
+    Returns:
+        numpy.ndarray: Normalized scores (NaN for raters that cannot be normalized)
+    """
+    count, mean, std = group_moments(user_codes, scores, n_users)
+    usable = (count >= MIN_RATINGS) & (std > 0)
+    safe_std = np.where(usable, std, 1.0)
+    z = (scores - mean[user_codes]) / safe_std[user_codes]
+    z[~usable[user_codes]] = np.nan
+    return z
+
+def screen_raters(user_codes, video_codes, scores, n_users, n_videos):
+    """
+    Screen raters with the ITU-R BT.500 outlier procedure.
+
+    For every video, ratings further than 2 standard deviations from its mean (sqrt(20)
+    standard deviations if the scores are not normally distributed, judged by their
+    kurtosis) count as outliers above (P) or below (Q) the mean. A rater is rejected if
+    more than 5% of their ratings are outliers and the outliers are not mostly on one
+    side, i.e. |P - Q| / (P + Q) < 0.3.
+
+    Args:
+        user_codes (numpy.ndarray): User code of each rating
+        video_codes (numpy.ndarray): Video code of each rating
+        scores (numpy.ndarray): Raw scores
+        n_users (int): Number of users
+        n_videos (int): Number of videos
+
+    Returns:
+        dict: Per-user arrays: ratings, P, Q, correlation with the video MOS, rejected flag
+    """
+    count, mean, std = group_moments(video_codes, scores, n_videos)
+    deviation = scores - mean[video_codes]
+    m2 = np.bincount(video_codes, weights=deviation ** 2, minlength=n_videos) / count
+    m4 = np.bincount(video_codes, weights=deviation ** 4, minlength=n_videos) / count
+    with np.errstate(invalid='ignore', divide='ignore'):
+        kurtosis = m4 / (m2 * m2)
+    normal = (kurtosis >= 2) & (kurtosis <= 4)
+    spread = np.where(normal, 2.0, np.sqrt(20.0)) * np.nan_to_num(std)
+    spread = spread[video_codes]
+
+    above = (spread > 0) & (scores >= mean[video_codes] + spread)
+    below = (spread > 0) & (scores <= mean[video_codes] - spread)
+    ratings = np.bincount(user_codes, minlength=n_users).astype(float)
+    p = np.bincount(user_codes, weights=above.astype(float), minlength=n_users)
+    q = np.bincount(user_codes, weights=below.astype(float), minlength=n_users)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rejected = ((p + q) / ratings > REJECT_RATIO) & (np.abs(p - q) / (p + q) < SYMMETRY_RATIO)
+
+    # Pearson correlation between each rater's scores and the MOS of the same videos
+    mos = mean[video_codes]
+    sums = [np.bincount(user_codes, weights=w, minlength=n_users)
+            for w in (scores, mos, scores * mos, scores * scores, mos * mos)]
+    s_x, s_y, s_xy, s_xx, s_yy = sums
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = s_xy - s_x * s_y / ratings
+        correlation = cov / np.sqrt((s_xx - s_x ** 2 / ratings) * (s_yy - s_y ** 2 / ratings))
+
+    return {
+        'ratings': ratings.astype(int),
+        'p': p.astype(int),
+        'q': q.astype(int),
+        'correlation': correlation,
+        'rejected': rejected
+    }
+
+def krippendorff_alpha_interval(unit_codes, values, n_units):
+    """
+    Krippendorff's alpha for interval data.
+
+    Uses the closed forms of the observed and expected disagreement: within a unit with m
+    values, the sum of squared differences over all ordered pairs is 2 * (m * sum(v^2) -
+    sum(v)^2). Only units with at least two values are pairable.
+
+    Args:
+        unit_codes (numpy.ndarray): Unit (video) code of each value
+        values (numpy.ndarray): Rated values
+        n_units (int): Number of units
+
+    Returns:
+        float: Alpha (1 is perfect agreement, 0 is chance), NaN if undefined
+    """
+    m = np.bincount(unit_codes, minlength=n_units).astype(float)
+    pairable = m >= 2
+    keep = pairable[unit_codes]
+    values = values[keep]
+    unit_codes = unit_codes[keep]
+    n = float(len(values))
+    if n < 2:
+        return float('nan')
+
+    s1 = np.bincount(unit_codes, weights=values, minlength=n_units)[pairable]
+    s2 = np.bincount(unit_codes, weights=values * values, minlength=n_units)[pairable]
+    m = m[pairable]
+    observed = np.sum(2 * (m * s2 - s1 * s1) / (m - 1)) / n
+    expected = 2 * (n * np.sum(values * values) - np.sum(values) ** 2) / (n * (n - 1))
+    if expected == 0:
+        return float('nan')
+    return float(1 - observed / expected)
+
+def analyze_raters(df):
+    """
+    Normalize ratings per rater and compute rater screening and agreement statistics.
+
+    Args:
+        df (pandas.DataFrame): Responses with user, video filename and score columns
+
+    Returns:
+        dict: Per-rating and per-rater tables, per-video MOS and agreement statistics
+    """
+    with instrumentation.stage('raters:normalize', rows=len(df)):
+        ratings = extract_ratings(df)
+        n_users, n_videos = len(ratings['users']), len(ratings['videos'])
+        z = zscore_by_rater(ratings['user'], ratings['score'], n_users)
+
+    with instrumentation.stage('raters:screen'):
+        screening = screen_raters(ratings['user'], ratings['video'], ratings['score'], n_users, n_videos)
+
+    with instrumentation.stage('raters:agreement'):
+        alpha_raw = krippendorff_alpha_interval(ratings['video'], ratings['score'], n_videos)
+        # Ratings of raters without a usable scale have no z-score and are left out
+        normalized = ~np.isnan(z)
+        alpha_z = krippendorff_alpha_interval(ratings['video'][normalized], z[normalized], n_videos)
+        kept = normalized & ~screening['rejected'][ratings['user']]
+        alpha_kept = krippendorff_alpha_interval(ratings['video'][kept], z[kept], n_videos)
+
+    _, user_mean, user_std = group_moments(ratings['user'], ratings['score'], n_users)
+    raters = pd.DataFrame({
+        USER_COLUMN: ratings['users'],
+        'Ratings': screening['ratings'],
+        'Mean Score': user_mean,
+        'Score Std': user_std,
+        'Normalized': np.bincount(ratings['user'][normalized], minlength=n_users) > 0,
+        'Outliers Above': screening['p'],
+        'Outliers Below': screening['q'],
+        'MOS Correlation': screening['correlation'],
+        'Rejected': screening['rejected']
+    })
+
+    video_count, raw_mos, _ = group_moments(ratings['video'], ratings['score'], n_videos)
+    _, z_mos, _ = group_moments(ratings['video'][normalized], z[normalized], n_videos)
+    _, z_mos_kept, _ = group_moments(ratings['video'][kept], z[kept], n_videos)
+    mos = pd.DataFrame({
+        'Video': ratings['videos'],
+        'Ratings': video_count.astype(int),
+        'Raw MOS': raw_mos,
+        'Normalized MOS': z_mos,
+        'Normalized MOS (screened)': z_mos_kept
+    }).sort_values('Normalized MOS (screened)', ascending=False, ignore_index=True)
+
+    table = pd.DataFrame({
+        USER_COLUMN: ratings['users'][ratings['user']],
+        'Video': ratings['videos'][ratings['video']],
+        'Score': ratings['score'],
+        'Z-Score': z
+    })
+
+    return {
+        'ratings': table,
+        'raters': raters,
+        'mos': mos,
+        'alpha_raw': alpha_raw,
+        'alpha_normalized': alpha_z,
+        'alpha_screened': alpha_kept
+    }
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description='Normalize ratings per rater and compute agreement statistics.')
+    parser.add_argument('--csv', type=str, help='Path to CSV file with QoE data')
+    parser.add_argument('--save-raters', type=str, help='Save the per-rater table to a CSV file')
+    parser.add_argument('--save-ratings', type=str, help='Save the normalized ratings to a CSV file')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+
+    print("Rater Statistics")
+    print("----------------")
+
+    with instrumentation.from_arguments(args):
+        df = load_data(args.csv)
+
+        missing = [col for col in [USER_COLUMN] + VIDEO_COLUMNS + SCORE_COLUMNS if col not in df.columns]
+        if missing:
+            print(f"Error: missing columns: {', '.join(missing)}")
+            sys.exit(1)
+
+        results = analyze_raters(df)
+
+    raters = results['raters']
+    rejected = raters[raters['Rejected']]
+    print(f"\nRaters: {len(raters)}, ratings: {len(results['ratings'])}")
+    print(f"Not normalized (fewer than {MIN_RATINGS} ratings or constant scores, "
+          f"left out of the normalized statistics): {int((~raters['Normalized']).sum())}")
+    print(f"Rejected by BT.500 screening: {len(rejected)}")
+    for user_id in rejected[USER_COLUMN].head(20):
+        print(f"  {user_id}")
+    if len(rejected) > 20:
+        print(f"  ... and {len(rejected) - 20} more")
+
+    print("\nKrippendorff's alpha (interval):")
+    print(f"  Raw scores:                  {results['alpha_raw']:.3f}")
+    print(f"  Normalized scores:           {results['alpha_normalized']:.3f}")
+    print(f"  Normalized, screened raters: {results['alpha_screened']:.3f}")
+
+    print("\nMean opinion score by video:")
+    with pd.option_context('display.max_colwidth', 60, 'display.width', 200):
+        print(results['mos'].to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+
+    if args.save_raters:
+        raters.to_csv(args.save_raters, index=False)
+        print(f"\nPer-rater table saved to {args.save_raters}")
+    if args.save_ratings:
+        results['ratings'].to_csv(args.save_ratings, index=False)
+        print(f"Normalized ratings saved to {args.save_ratings}")
+
+if __name__ == "__main__":
+    main()
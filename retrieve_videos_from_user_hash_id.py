@@ -23,6 +23,8 @@ import csv
 import os
 from collections import defaultdict
 
+import instrumentation
+
 def hash_string_to_seed(s):
     """Convert a string to a 32-bit unsigned integer seed, matching JavaScript."""
     hash_ = 5381
@@ -56,6 +58,7 @@ def get_video_list_hash(videos):
 
 import json
 
+@instrumentation.instrumented('parse', rows=lambda result: len(result[0] or []))
 def load_user_pairs_from_csv(user_id, filepath='qoe_data.csv'):
     """Load video pairs for a specific user from the QoE data CSV file."""
     if not os.path.exists(filepath):
@@ -110,6 +113,7 @@ def load_user_pairs_from_csv(user_id, filepath='qoe_data.csv'):
         print(f"Error loading {filepath}: {e}")
         return None, None
 
+@instrumentation.instrumented('pair_generation', rows=len)
 def generate_pairs_for_user(user_id, videos):
     """Generate the exact video pairs shown to a user during their session."""
     user_seed = hash_string_to_seed(user_id)
@@ -199,68 +203,70 @@ if __name__ == "__main__":
     parser.add_argument("--csv", action="store_true", help="Output in CSV format")
     parser.add_argument("--save", type=str, help="Save output to file")
     parser.add_argument("--generate", action="store_true", help="Generate pairs algorithmically instead of using CSV data")
+    instrumentation.add_arguments(parser)
     args = parser.parse_args()
     
-    # First try to load pairs directly from CSV
-    pairs = None
-    metadata = None
+    with instrumentation.from_arguments(args):
+        # First try to load pairs directly from CSV
+        pairs = None
+        metadata = None
     
-    if not args.generate:
-        pairs, metadata = load_user_pairs_from_csv(args.user_id)
+        if not args.generate:
+            pairs, metadata = load_user_pairs_from_csv(args.user_id)
     
-    # If no pairs found in CSV or --generate flag is used, fall back to algorithmic generation
-    if pairs is None or args.generate:
-        print("Falling back to algorithmic pair generation...")
+        # If no pairs found in CSV or --generate flag is used, fall back to algorithmic generation
+        if pairs is None or args.generate:
+            print("Falling back to algorithmic pair generation...")
         
-        # Load video list from JSON
-        try:
-            with open('video_list.json', 'r') as f:
-                data = json.load(f)
+            # Load video list from JSON
+            try:
+                with open('video_list.json', 'r') as f:
+                    data = json.load(f)
             
-            if isinstance(data, dict) and "files" in data:
-                videos = data["files"]
-                metadata = {
-                    "version": data.get("version", "unknown"),
-                    "hash": data.get("hash", "unknown"),
-                    "timestamp": data.get("generated_at", "unknown")
-                }
-                print(f"Loaded {len(videos)} videos from video_list.json")
-            else:
-                raise ValueError("Unexpected JSON structure in video list file")
+                if isinstance(data, dict) and "files" in data:
+                    videos = data["files"]
+                    metadata = {
+                        "version": data.get("version", "unknown"),
+                        "hash": data.get("hash", "unknown"),
+                        "timestamp": data.get("generated_at", "unknown")
+                    }
+                    print(f"Loaded {len(videos)} videos from video_list.json")
+                else:
+                    raise ValueError("Unexpected JSON structure in video list file")
                 
-        except Exception as e:
-            print(f"Error loading video_list.json: {e}")
-            # Fallback to hardcoded list
-            videos = [
-                "videos/TEMP_TEST.mp4",
-                "videos/interpolated_rife_1280_720_30fps.mp4",
-                "videos/interpolated_video_addWeighted.mp4",
-                "videos/interpolated_video_film.mp4",
-                "videos/original_video.mp4",
-                "videos/original_video_1280_720.mp4",
-                "videos/original_video_upsampled_from_1280_720_to_1920_1080.mp4",
-                "videos/video_with_degrad_mk11_1080p.mp4"
-            ]
-            metadata = {"version": "unknown", "hash": "unknown", "timestamp": "unknown"}
-            print(f"Using fallback list with {len(videos)} videos")
+            except Exception as e:
+                print(f"Error loading video_list.json: {e}")
+                # Fallback to hardcoded list
+                videos = [
+                    "videos/TEMP_TEST.mp4",
+                    "videos/interpolated_rife_1280_720_30fps.mp4",
+                    "videos/interpolated_video_addWeighted.mp4",
+                    "videos/interpolated_video_film.mp4",
+                    "videos/original_video.mp4",
+                    "videos/original_video_1280_720.mp4",
+                    "videos/original_video_upsampled_from_1280_720_to_1920_1080.mp4",
+                    "videos/video_with_degrad_mk11_1080p.mp4"
+                ]
+                metadata = {"version": "unknown", "hash": "unknown", "timestamp": "unknown"}
+                print(f"Using fallback list with {len(videos)} videos")
         
-        # Generate pairs algorithmically
-        pairs = generate_pairs_for_user(args.user_id, videos)
+            # Generate pairs algorithmically
+            pairs = generate_pairs_for_user(args.user_id, videos)
     
-    # Output
-    print(f"\nUser ID: {args.user_id}")
-    if metadata:
-        print(f"Video list version: {metadata['version']}")
-        print(f"Video list hash: {metadata['hash']}")
+        # Output
+        print(f"\nUser ID: {args.user_id}")
+        if metadata:
+            print(f"Video list version: {metadata['version']}")
+            print(f"Video list hash: {metadata['hash']}")
     
-    if args.csv:
-        if args.save:
-            output_csv(pairs, args.save)
+        if args.csv:
+            if args.save:
+                output_csv(pairs, args.save)
+            else:
+                print(output_csv(pairs))
         else:
-            print(output_csv(pairs))
-    else:
-        # Default tab-separated output
-        print(f"\n{'Scene':<10}\t{'VideoA':<50}\t{'VideoB':<50}")
-        print("-" * 110)
-        for pair in pairs:
-            print(f"{pair['scene']:<10}\t{pair['videoA']:<50}\t{pair['videoB']:<50}")
+            # Default tab-separated output
+            print(f"\n{'Scene':<10}\t{'VideoA':<50}\t{'VideoB':<50}")
+            print("-" * 110)
+            for pair in pairs:
+                print(f"{pair['scene']:<10}\t{pair['videoA']:<50}\t{pair['videoB']:<50}")
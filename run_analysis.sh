@@ -1,8 +1,9 @@
 #!/bin/bash
 # QoE Analysis Pipeline
-# This script runs the entire QoE analysis pipeline:
+# This script runs the entire QoE analysis pipeline via run_pipeline.py:
 # 1. Downloads the data from the Google Sheet
 # 2. Analyzes the data and generates visualizations
+# Extra arguments are passed through (e.g. --csv qoe_data.csv, --force)
 
 # Set up error handling
 set -e
@@ -17,45 +18,63 @@ if ! command -v python3 &> /dev/null; then
     exit 1
 fi
 
-# Check if required packages are installed
+# Check if required packages are installed (find_spec locates them without importing them)
 echo "Checking dependencies..."
-python3 -c "import sys; sys.exit(0 if all(map(lambda m: m in sys.modules or __import__(m), ['pandas', 'matplotlib', 'seaborn', 'numpy', 'requests'])) else 1)" 2>/dev/null
-if [ $? -ne 0 ]; then
+if ! python3 -c "import importlib.util, sys; sys.exit(0 if all(importlib.util.find_spec(m) for m in ['pandas', 'matplotlib', 'seaborn', 'numpy', 'requests']) else 1)" 2>/dev/null; then
     echo "Installing required packages..."
     pip install -r requirements.txt
 fi
 
 # Create output directory
 OUTPUT_DIR="visualizations"
-mkdir -p "$OUTPUT_DIR"
 
-# Step 1: Download the data
-echo
-echo "Step 1: Downloading data from Google Sheet..."
-python3 download_qoe_data.py
-if [ $? -ne 0 ]; then
-    echo "Error: Failed to download data"
-    exit 1
-fi
+# Output format passed through to run_pipeline.py (png, json or both)
+FORMAT="png"
+PREVIOUS=""
+for ARG in "$@"; do
+    case "$ARG" in
+        --format=*) FORMAT="${ARG#--format=}" ;;
+        *) if [ "$PREVIOUS" = "--format" ]; then FORMAT="$ARG"; fi ;;
+    esac
+    PREVIOUS="$ARG"
+done
+mkdir -p "$OUTPUT_DIR"
 
-# Step 2: Analyze the data
+# Run download -> parse -> analyze -> plot in a single process.
+# Unchanged stages are skipped using the cache in .pipeline_cache/
 echo
-echo "Step 2: Analyzing data and generating visualizations..."
-python3 analyze_qoe_data.py --csv qoe_data.csv --output "$OUTPUT_DIR"
+echo "Running the analysis pipeline..."
+python3 run_pipeline.py --output "$OUTPUT_DIR" "$@"
 if [ $? -ne 0 ]; then
-    echo "Error: Failed to analyze data"
+    echo "Error: Analysis pipeline failed"
     exit 1
 fi
 
 echo
 echo "Analysis completed successfully!"
-echo "Visualizations are available in the '$OUTPUT_DIR' directory"
+echo "Outputs are available in the '$OUTPUT_DIR' directory"
 echo
 
-# List generated visualizations
-echo "Generated visualizations:"
-ls -1 "$OUTPUT_DIR"/*.png | sed 's/^/- /'
+# List the generated outputs of the chosen format
+echo "Generated outputs:"
+PATTERNS=()
+if [ "$FORMAT" = "png" ] || [ "$FORMAT" = "both" ]; then
+    PATTERNS+=("$OUTPUT_DIR"/*.png)
+fi
+if [ "$FORMAT" = "json" ] || [ "$FORMAT" = "both" ]; then
+    PATTERNS+=("$OUTPUT_DIR"/*.json)
+fi
+for FILE in "${PATTERNS[@]}"; do
+    if [ -e "$FILE" ]; then
+        echo "- $FILE"
+    fi
+done
 
 echo
-echo "To view the visualizations, open the files in your preferred image viewer"
-echo "For example: open $OUTPUT_DIR/overall_accuracy.png"
+if [ "$FORMAT" = "png" ] || [ "$FORMAT" = "both" ]; then
+    echo "To view the visualizations, open the files in your preferred image viewer"
+    echo "For example: open $OUTPUT_DIR/overall_accuracy.png"
+fi
+if [ "$FORMAT" = "json" ] || [ "$FORMAT" = "both" ]; then
+    echo "To view the dashboard, serve this directory and open dashboard.html (see README.md)"
+fi
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+QoE Analysis Pipeline Runner
+
+This script runs the complete QoE analysis pipeline (download -> parse -> analyze -> plot ->
+time series) as stages inside a single Python process. Each stage is keyed by a hash of its
+inputs and of the code it runs, so stages whose inputs did not change since the last run
+are skipped. Heavy libraries (pandas, matplotlib, seaborn) are only imported when a stage
+actually runs, which keeps a no-op rerun well under a second.
+
+Usage:
+    python run_pipeline.py                      # download, then run only the stages that changed
+    python run_pipeline.py --csv qoe_data.csv   # skip the download and use a local CSV
+    python run_pipeline.py --force              # ignore the cache and rerun every stage
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import sys
+import time
+
+import instrumentation
+
+# Constants
+CACHE_DIR = '.pipeline_cache'
+MANIFEST_FILE = 'manifest.json'
+DEFAULT_CSV = 'qoe_data.csv'
+DEFAULT_OUTPUT_DIR = 'visualizations'
+PLOT_FILES = [
+    'overall_accuracy.png',
+    'accuracy_by_type.png',
+    'confusion_matrix.png',
+    'user_accuracy_distribution.png'
+]
+DASHBOARD_FILE = 'dashboard_data.json'
+TIME_SERIES_FILE = 'time_series_trend.png'
+
+def file_digest(path):
+    """
+    Calculate the SHA-256 digest of a file's contents.
+
+    Args:
+        path (str): Path to the file
+
+    Returns:
+        str: Hex digest, or an empty string if the file does not exist
+    """
+    if not os.path.exists(path):
+        return ''
+    hash_obj = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            hash_obj.update(chunk)
+    return hash_obj.hexdigest()
+
+def module_digest(module_name):
+    """Hash the source file of a sibling module so code changes invalidate the cache."""
+    return file_digest(os.path.join(os.path.dirname(os.path.abspath(__file__)), f"{module_name}.py"))
+
+def stage_key(*parts):
+    """Combine the inputs of a stage into a single cache key."""
+    return hashlib.sha256('\n'.join(str(p) for p in parts).encode()).hexdigest()[:16]
+
+def load_manifest(cache_dir):
+    """Load the stage keys recorded by the previous run."""
+    path = os.path.join(cache_dir, MANIFEST_FILE)
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(cache_dir, manifest):
+    """Persist the stage keys of the current run."""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, MANIFEST_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+class Pipeline:
+    """Runs stages in order, skipping those whose key matches the previous run."""
+
+    def __init__(self, cache_dir=CACHE_DIR, force=False):
+        self.cache_dir = cache_dir
+        self.force = force
+        self.manifest = load_manifest(cache_dir)
+        self.timings = []
+
+    def cache_path(self, filename):
+        """Return the path of a file stored in the cache directory."""
+        return os.path.join(self.cache_dir, filename)
+
+    def run_stage(self, name, key, action, outputs=()):
+        """
+        Run a stage unless its key and outputs are unchanged.
+
+        Args:
+            name (str): Stage name
+            key (str): Cache key derived from the stage inputs
+            action (callable): Function that performs the stage
+            outputs (iterable): Files the stage must have produced to be skipped
+
+        Returns:
+            bool: True if the stage ran, False if it was skipped
+        """
+        start = time.perf_counter()
+        cached = (not self.force
+                  and self.manifest.get(name) == key
+                  and all(os.path.exists(p) for p in outputs))
+        if cached:
+            status = 'skipped'
+        else:
+            print(f"\n[{name}] running...")
+            action()
+            self.manifest[name] = key
+            save_manifest(self.cache_dir, self.manifest)
+            status = 'ran'
+        elapsed = time.perf_counter() - start
+        self.timings.append((name, status, elapsed))
+        return not cached
+
+    def run_uncached(self, name, action):
+        """
+        Run a stage that has no cache key and is therefore never skipped.
+
+        Args:
+            name (str): Stage name
+            action (callable): Function that performs the stage
+        """
+        start = time.perf_counter()
+        print(f"\n[{name}] running...")
+        action()
+        self.timings.append((name, 'ran', time.perf_counter() - start))
+
+    def print_summary(self):
+        """Print per-stage timings."""
+        print("\nStage timings:")
+        for name, status, elapsed in self.timings:
+            print(f"  {name:<12} {status:<8} {elapsed:8.3f}s")
+        total = sum(elapsed for _, _, elapsed in self.timings)
+        print(f"  {'total':<12} {'':<8} {total:8.3f}s")
+
+def run(csv_path=None, output_dir=DEFAULT_OUTPUT_DIR, cache_dir=CACHE_DIR, force=False,
+        dedup_keep='first', output_format='png'):
+    """
+    Run the download, parse, analyze, plot and time series stages.
+
+    Args:
+        csv_path (str): Local CSV to analyze; when None the data is downloaded first
+        output_dir (str): Directory to save visualizations
+        cache_dir (str): Directory holding cached stage outputs
+        force (bool): Rerun every stage regardless of the cache
+        dedup_keep (str): Keep the "first" or "last" row of duplicate submissions;
+            None keeps every row
+        output_format (str): "png" to render the charts, "json" to write the dashboard
+            data only, or "both"
+
+    Returns:
+        bool: True if the pipeline completed, False otherwise
+    """
+    pipeline = Pipeline(cache_dir, force)
+    state = {}
+
+    # Stage 1: download. The remote sheet cannot be hashed without fetching it, so this
+    # stage is not cached and always runs when requested. Downstream stages are keyed on
+    # the downloaded bytes, so they are still skipped when the sheet did not change.
+    if csv_path is None:
+        csv_path = DEFAULT_CSV
+
+        def download():
+            from download_qoe_data import download_sheet_as_csv, SHEET_URL
+            if not download_sheet_as_csv(SHEET_URL, csv_path, dedup_keep=None):
+                raise RuntimeError("Failed to download data")
+
+        pipeline.run_uncached('download', download)
+
+    if not os.path.exists(csv_path):
+        print(f"Error: {csv_path} not found")
+        return False
+
+    # Stage 2: parse the CSV into a DataFrame, dropping duplicate submissions
+    parsed_path = pipeline.cache_path('parsed.pkl')
+    parse_key = stage_key(file_digest(csv_path), dedup_keep,
+                          module_digest('analyze_qoe_data'), module_digest('dedup_qoe_data'))
+
+    def parse():
+        from analyze_qoe_data import load_data_from_csv
+        os.makedirs(pipeline.cache_dir, exist_ok=True)
+        source_path = csv_path
+        if dedup_keep:
+            from dedup_qoe_data import dedupe_csv
+            try:
+                _, dropped = dedupe_csv(csv_path, pipeline.cache_path('deduped.csv'), keep=dedup_keep)
+                source_path = pipeline.cache_path('deduped.csv')
+                print(f"Removed {dropped} duplicate submissions")
+            except ValueError as e:
+                print(f"Warning: duplicate submissions were not removed: {e}")
+        df = load_data_from_csv(source_path)
+        print(f"Loaded {len(df)} records")
+        df.to_pickle(parsed_path)
+        state['df'] = df
+
+    pipeline.run_stage('parse', parse_key, parse, [parsed_path])
+
+    # Stage 3: analyze
+    results_path = pipeline.cache_path('results.pkl')
+    analyze_key = stage_key(parse_key, module_digest('analyze_qoe_data'))
+
+    def analyze():
+        from analyze_qoe_data import analyze_data
+        if 'df' not in state:
+            import pandas as pd
+            state['df'] = pd.read_pickle(parsed_path)
+        results = analyze_data(state['df'])
+        with open(results_path, 'wb') as f:
+            pickle.dump(results, f, protocol=pickle.HIGHEST_PROTOCOL)
+        state['results'] = results
+        print(f"Overall accuracy: {results['overall_accuracy']:.2%}")
+
+    pipeline.run_stage('analyze', analyze_key, analyze, [results_path])
+
+    # Stage 4: plot (PNG charts and/or dashboard JSON)
+    plot_key = stage_key(analyze_key, os.path.abspath(output_dir), output_format)
+
+    def plot():
+        from analyze_qoe_data import generate_visualizations, write_dashboard_data
+        if 'results' not in state:
+            with open(results_path, 'rb') as f:
+                state['results'] = pickle.load(f)
+        if output_format in ('png', 'both'):
+            generate_visualizations(state['results'], output_dir)
+        if output_format in ('json', 'both'):
+            write_dashboard_data(state['results'], output_dir)
+
+    plot_files = []
+    if output_format in ('png', 'both'):
+        plot_files += PLOT_FILES
+    if output_format in ('json', 'both'):
+        plot_files.append(DASHBOARD_FILE)
+    pipeline.run_stage('plot', plot_key, plot,
+                       [os.path.join(output_dir, name) for name in plot_files])
+
+    # Stage 5: time series (daily accuracy and response-rate trend)
+    if output_format in ('png', 'both'):
+        time_series_key = stage_key(analyze_key, os.path.abspath(output_dir),
+                                    module_digest('qoe_time_series'))
+
+        def time_series():
+            from qoe_time_series import analyze_time_series, plot_trend
+            if 'results' not in state:
+                with open(results_path, 'rb') as f:
+                    state['results'] = pickle.load(f)
+            trend = analyze_time_series(state['results']['df'])
+            if trend['buckets'].empty:
+                print("No timestamped responses found")
+            else:
+                plot_trend(trend, output_dir)
+
+        pipeline.run_stage('time_series', time_series_key, time_series,
+                           [os.path.join(output_dir, TIME_SERIES_FILE)])
+
+    pipeline.print_summary()
+    return True
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description='Run the QoE analysis pipeline with stage caching.')
+    parser.add_argument('--csv', type=str,
+                        help='Analyze a local CSV file instead of downloading the data')
+    parser.add_argument('--output', type=str, default=DEFAULT_OUTPUT_DIR,
+                        help=f'Directory to save visualizations (default: {DEFAULT_OUTPUT_DIR})')
+    parser.add_argument('--cache-dir', type=str, default=CACHE_DIR,
+                        help=f'Directory for cached stage outputs (default: {CACHE_DIR})')
+    parser.add_argument('--force', action='store_true',
+                        help='Rerun every stage, ignoring cached results')
+    parser.add_argument('--dedup', choices=['first', 'last', 'none'], default='first',
+                        help='Keep the first or last row of duplicate submissions, or none to keep all rows (default: first)')
+    parser.add_argument('--format', choices=['png', 'json', 'both'], default='png',
+                        help='Render PNG charts, write dashboard JSON for dashboard.html, or both (default: png)')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+
+    print("QoE Analysis Pipeline")
+    print("---------------------")
+
+    try:
+        with instrumentation.from_arguments(args):
+            dedup_keep = None if args.dedup == 'none' else args.dedup
+            success = run(args.csv, args.output, args.cache_dir, args.force, dedup_keep, args.format)
+    except Exception as e:
+        print(f"Error: {e}")
+        success = False
+
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Pair Coverage Simulator
+
+Every participant sees 5 of the possible video pairs, chosen deterministically from
+their user ID, and each pair is shown in a fixed A/B order that is also derived from the
+ID. This script draws random user IDs the same way generateRandomUserId does in
+index.html (10 characters from [A-Za-z0-9]). It computes their assignments with the
+functions in retrieve_videos_from_user_hash_id.py and reports:
+
+- how many participants see each pair (coverage histogram)
+- how often each pair is shown swapped (A/B balance)
+- how many participants are needed until every pair, and every A/B ordering, has been
+  seen at least --min-count times
+
+Assignments are computed in batches across a process pool, and every batch is checked
+against generate_pairs_for_user so the simulation cannot drift from the real scheme.
+
+Usage:
+    python simulate_pair_coverage.py --participants 1000000
+    python simulate_pair_coverage.py --participants 200 --min-count 20 --video-list video_list.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import instrumentation
+from retrieve_videos_from_user_hash_id import (
+    hash_string_to_seed, seeded_random, select_random_pairs_with_seed, generate_pairs_for_user
+)
+
+# Constants
+ID_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789'  # As in index.html
+ID_LENGTH = 10
+PAIRS_PER_USER = 5  # Must match generate_pairs_for_user and the frontend
+DEFAULT_PARTICIPANTS = 100000
+DEFAULT_BATCH_SIZE = 20000
+DEFAULT_MIN_COUNT = 10
+DEFAULT_SEED = 42
+CHECKPOINTS = [10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000, 500000, 1000000]
+
+def generate_user_ids(count, rng):
+    """
+    Draw random user IDs like generateRandomUserId in index.html.
+
+    Args:
+        count (int): Number of IDs
+        rng (numpy.random.Generator): Random generator
+
+    Returns:
+        list: User ID strings
+    """
+    alphabet = np.frombuffer(ID_ALPHABET.encode('ascii'), dtype=np.uint8)
+    chars = alphabet[rng.integers(0, len(alphabet), size=(count, ID_LENGTH))]
+    text = chars.tobytes().decode('ascii')
+    return [text[i:i + ID_LENGTH] for i in range(0, len(text), ID_LENGTH)]
+
+def assign_pairs(user_id, pair_indices, count=PAIRS_PER_USER):
+    """
+    Compute the pairs and A/B orderings shown to a user, as indices.
+
+    Follows generate_pairs_for_user step by step, but selects from a list of pair
+    indices instead of building the pair dicts for every user.
+
+    Args:
+        user_id (str): User ID
+        pair_indices (list): list(range(number of pairs))
+        count (int): Number of pairs shown to each user
+
+    Returns:
+        tuple: (pair indices, swap flags) in the order they are shown
+    """
+    user_seed = hash_string_to_seed(user_id)
+    selected = select_random_pairs_with_seed(pair_indices, count, user_seed)
+    swaps = [next(seeded_random(user_seed + idx)) >= 0.5 for idx in range(len(selected))]
+    return selected, swaps
+
+def check_assignment(user_id, videos, selected, swaps):
+    """
+    Check an assignment against generate_pairs_for_user.
+
+    Raises:
+        RuntimeError: If the two disagree
+    """
+    expected = generate_pairs_for_user(user_id, videos)
+    actual = [(f"Pair {index + 1}", swap) for index, swap in zip(selected, swaps)]
+    if actual != [(pair['scene'], pair['swapped']) for pair in expected]:
+        raise RuntimeError(f"Simulated assignment for user {user_id} does not match generate_pairs_for_user")
+
+def simulate_batch(args):
+    """
+    Draw a batch of user IDs and compute their assignments.
+
+    Args:
+        args (tuple): (videos, batch size, numpy SeedSequence for the batch)
+
+    Returns:
+        tuple: (pairs, swaps) arrays of shape (batch size, pairs per user)
+    """
+    videos, size, seed_sequence = args
+    num_pairs = len(videos) * (len(videos) - 1) // 2
+    pair_indices = list(range(num_pairs))
+    per_user = min(PAIRS_PER_USER, num_pairs)
+
+    user_ids = generate_user_ids(size, np.random.default_rng(seed_sequence))
+    pairs = np.empty((size, per_user), dtype=np.uint16 if num_pairs < 2 ** 16 else np.uint32)
+    swaps = np.empty((size, per_user), dtype=bool)
+    for row, user_id in enumerate(user_ids):
+        pairs[row], swaps[row] = assign_pairs(user_id, pair_indices, per_user)
+
+    if size:
+        check_assignment(user_ids[0], videos, pairs[0].tolist(), swaps[0].tolist())
+    return pairs, swaps
+
+def simulate(videos, participants, batch_size=DEFAULT_BATCH_SIZE, workers=None, seed=DEFAULT_SEED):
+    """
+    Simulate the assignments of a number of random participants.
+
+    Batches get independent child seeds of one SeedSequence, so the result depends only
+    on the seed and the batch size, not on the number of workers.
+
+    Args:
+        videos (list): Video list, in the order used by the frontend
+        participants (int): Number of participants to simulate
+        batch_size (int): Participants per batch
+        workers (int): Worker processes; 1 runs in this process
+        seed (int): Random seed
+
+    Returns:
+        tuple: (pairs, swaps) arrays with one row per participant, in arrival order
+    """
+    sizes = [batch_size] * (participants // batch_size)
+    if participants % batch_size:
+        sizes.append(participants % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(videos, size, child) for size, child in zip(sizes, seeds)]
+
+    with instrumentation.stage('simulate', rows=participants):
+        if workers == 1 or len(tasks) <= 1:
+            results = [simulate_batch(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(simulate_batch, tasks))
+
+    if not results:
+        return np.empty((0, 0), dtype=np.uint16), np.empty((0, 0), dtype=bool)
+    return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results])
+
+def participants_needed(codes, num_codes, min_count):
+    """
+    Number of participants until every code has been seen min_count times.
+
+    Args:
+        codes (numpy.ndarray): (participants, pairs per user) codes, in arrival order
+        num_codes (int): Number of distinct codes
+        min_count (int): Required number of occurrences per code
+
+    Returns:
+        numpy.ndarray: Participants needed for each code; -1 where the simulation was
+            too short to reach min_count
+    """
+    flat = codes.ravel()
+    order = np.argsort(flat, kind='stable')  # Keeps arrival order within each code
+    counts = np.bincount(flat, minlength=num_codes)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    needed = np.full(num_codes, -1, dtype=np.int64)
+    reached = counts >= min_count
+    position = order[starts[reached] + min_count - 1]
+    needed[reached] = position // codes.shape[1] + 1
+    return needed
+
+def summarize(pairs, swaps, num_pairs, min_count):
+    """
+    Compute coverage, A/B balance and required sample sizes.
+
+    Args:
+        pairs (numpy.ndarray): Pair indices per participant
+        swaps (numpy.ndarray): Swap flags per participant
+        num_pairs (int): Number of possible pairs
+        min_count (int): Required number of views per pair and per A/B ordering
+
+    Returns:
+        dict: Summary statistics
+    """
+    participants = pairs.shape[0]
+    pairs = pairs.astype(np.int64)
+    counts = np.bincount(pairs.ravel(), minlength=num_pairs)
+    swapped = np.bincount(pairs.ravel(), weights=swaps.ravel().astype(float), minlength=num_pairs)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        swap_share = swapped / counts
+
+    expected = participants * pairs.shape[1] / num_pairs if num_pairs else 0
+    chi_square = float(((counts - expected) ** 2 / expected).sum()) if expected else float('nan')
+
+    needed_pairs = participants_needed(pairs, num_pairs, min_count)
+    needed_orderings = participants_needed(pairs * 2 + swaps, 2 * num_pairs, min_count)
+
+    def overall(needed):
+        return int(needed.max()) if (needed >= 0).all() else None
+
+    # Smallest per-pair count after the first N participants
+    checkpoints = [n for n in CHECKPOINTS if n < participants] + [participants]
+    min_counts = [int(np.bincount(pairs[:n].ravel(), minlength=num_pairs).min()) for n in checkpoints]
+
+    return {
+        'participants': participants,
+        'counts': counts,
+        'swap_share': swap_share,
+        'expected': expected,
+        'chi_square': chi_square,
+        'degrees_of_freedom': num_pairs - 1,
+        'needed_pairs': needed_pairs,
+        'needed_orderings': needed_orderings,
+        'participants_for_pairs': overall(needed_pairs),
+        'participants_for_orderings': overall(needed_orderings),
+        'checkpoints': list(zip(checkpoints, min_counts))
+    }
+
+def print_summary(summary, videos, min_count):
+    """Print the simulation results."""
+    counts = summary['counts']
+    swap_share = summary['swap_share']
+    num_pairs = len(counts)
+
+    print(f"\nSimulated {summary['participants']} participants over {num_pairs} pairs "
+          f"({len(videos)} videos, {PAIRS_PER_USER} pairs each)")
+    print("\nViews per pair:")
+    print(f"  Expected: {summary['expected']:.1f}")
+    print(f"  Min: {counts.min()}  Median: {np.median(counts):.0f}  Max: {counts.max()}  "
+          f"CV: {counts.std() / max(counts.mean(), 1e-12):.3f}")
+    print(f"  Chi-square vs. uniform: {summary['chi_square']:.1f} on {summary['degrees_of_freedom']} degrees of freedom")
+
+    edges = np.histogram_bin_edges(counts, bins=min(10, max(1, num_pairs)))
+    hist, _ = np.histogram(counts, bins=edges)
+    print("\nCoverage histogram (pairs by number of views):")
+    width = max(hist.max(), 1)
+    for low, high, n in zip(edges[:-1], edges[1:], hist):
+        print(f"  {low:10.0f} - {high:10.0f}: {n:4d} {'#' * int(round(40 * n / width))}")
+
+    print("\nA/B balance (share of views shown swapped):")
+    print(f"  Overall: {np.nansum(swap_share * counts) / max(counts.sum(), 1):.2%}")
+    worst = np.argsort(-np.abs(np.nan_to_num(swap_share, nan=0.5) - 0.5))[:5]
+    for index in worst:
+        print(f"  Pair {index + 1}: {swap_share[index]:.2%} of {counts[index]} views")
+
+    print(f"\nParticipants needed for at least {min_count} views:")
+    for label, key in [('every pair', 'participants_for_pairs'),
+                       ('every A/B ordering', 'participants_for_orderings')]:
+        needed = summary[key]
+        if needed is None:
+            print(f"  {label}: not reached within {summary['participants']} participants")
+        else:
+            print(f"  {label}: {needed}")
+
+    print("\nSmallest per-pair count after N participants:")
+    for n, smallest in summary['checkpoints']:
+        print(f"  {n:>10}: {smallest}")
+
+def plot_coverage(summary, output_dir='.'):
+    """
+    Plot the number of views and the swapped share of each pair.
+
+    Args:
+        summary (dict): Output of summarize
+        output_dir (str): Directory to save the plot
+    """
+    import matplotlib.pyplot as plt
+
+    os.makedirs(output_dir, exist_ok=True)
+    counts = summary['counts']
+    labels = [str(i + 1) for i in range(len(counts))]
+    path = os.path.join(output_dir, 'pair_coverage.png')
+
+    with instrumentation.stage('plot:pair_coverage'):
+        fig, (top, bottom) = plt.subplots(2, 1, figsize=(max(10, len(counts) * 0.3), 8), sharex=True)
+        top.bar(labels, counts, color='steelblue')
+        top.axhline(summary['expected'], color='black', linestyle='--', label='Expected')
+        top.set_ylabel('Views', fontsize=12)
+        top.set_title(f"Simulated Pair Coverage ({summary['participants']} participants)", fontsize=16)
+        top.legend()
+        bottom.bar(labels, summary['swap_share'], color='darkorange')
+        bottom.axhline(0.5, color='black', linestyle='--')
+        bottom.set_ylim(0, 1)
+        bottom.set_ylabel('Share Swapped', fontsize=12)
+        bottom.set_xlabel('Pair', fontsize=12)
+        plt.tight_layout()
+        plt.savefig(path, dpi=300)
+        plt.close(fig)
+
+    print(f"\nCoverage plot saved to {path}")
+
+def load_video_list(path):
+    """Load the file list from a video_list.json file."""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or 'files' not in data:
+        raise ValueError(f"Unexpected JSON structure in {path}")
+    return data['files']
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description='Simulate pair coverage of the deterministic pair assignment.')
+    parser.add_argument('--participants', type=int, default=DEFAULT_PARTICIPANTS,
+                        help=f'Number of simulated participants (default: {DEFAULT_PARTICIPANTS})')
+    parser.add_argument('--video-list', type=str, default='video_list.json',
+                        help='Video list JSON file (default: video_list.json)')
+    parser.add_argument('--min-count', type=int, default=DEFAULT_MIN_COUNT,
+                        help=f'Required views per pair and per A/B ordering (default: {DEFAULT_MIN_COUNT})')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'Participants per batch (default: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: number of CPUs)')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help=f'Random seed (default: {DEFAULT_SEED})')
+    parser.add_argument('--output', type=str, default='visualizations', help='Directory to save the plot')
+    parser.add_argument('--no-plot', action='store_true', help='Do not generate the coverage plot')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.participants < 1 or args.batch_size < 1 or args.min_count < 1:
+        print("Error: --participants, --batch-size and --min-count must be positive")
+        sys.exit(1)
+
+    print("Pair Coverage Simulator")
+    print("-----------------------")
+
+    try:
+        videos = load_video_list(args.video_list)
+    except Exception as e:
+        print(f"Error loading {args.video_list}: {e}")
+        sys.exit(1)
+    num_pairs = len(videos) * (len(videos) - 1) // 2
+    if num_pairs == 0:
+        print("Error: the video list needs at least two videos")
+        sys.exit(1)
+    print(f"Loaded {len(videos)} videos from {args.video_list}")
+
+    with instrumentation.from_arguments(args):
+        pairs, swaps = simulate(videos, args.participants, args.batch_size, args.workers, args.seed)
+        summary = summarize(pairs, swaps, num_pairs, args.min_count)
+        print_summary(summary, videos, args.min_count)
+        if not args.no_plot:
+            plot_coverage(summary, args.output)
+
+if __name__ == "__main__":
+    main()
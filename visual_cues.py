@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Visual Cues Analysis
+
+The "Visual Cues" column stores the cues a participant relied on as a comma-joined
+string, e.g. "animation,textures,movement". This script encodes the column as a sparse
+CSR indicator matrix (one row per response, one column per cue). It then uses sparse
+matrix products to compute:
+
+- how often each cue is mentioned for each actual Reality (e.g. "Video A is Real")
+- how often each cue is mentioned in correct and incorrect guesses
+- how often every pair of cues is mentioned together (co-occurrence)
+
+The column is tokenized with a single split over the joined column, not a str.split
+and explode per row, so millions of responses stay fast and compact.
+
+Usage:
+    python visual_cues.py --csv qoe_data.csv
+    python visual_cues.py --csv qoe_data.csv --save-dir cue_tables
+"""
+
+import argparse
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+import instrumentation
+from analyze_qoe_data import load_data, analyze_data
+
+# Constants
+CUES_COLUMN = 'Visual Cues'
+ROW_SEPARATOR = '\x1e'  # ASCII record separator, cannot appear in form input
+EMPTY_CUES = {'', 'n/a', 'na'}
+SEPARATOR_SPACES = re.compile(r'[ \t\r\n]*,[ \t\r\n]*')
+
+def encode_visual_cues(cues):
+    """
+    Encode comma-joined cue strings as a sparse indicator matrix.
+
+    All rows are joined into one string with a separator token between rows, cleaned and
+    split once, and the row boundaries are recovered with a cumulative sum over the
+    separator tokens.
+
+    Args:
+        cues (pandas.Series): Comma-joined cue strings, one per response
+
+    Returns:
+        tuple: (matrix, vocabulary) where matrix is an n x k scipy.sparse CSR matrix of
+            0/1 values and vocabulary is the sorted list of k cue names
+    """
+    n = len(cues)
+    values = cues.fillna('').astype(str).tolist()
+    joined = f",{ROW_SEPARATOR},".join(values).lower()
+    # Every token is now delimited by commas, so this also trims the ends of each row
+    joined = SEPARATOR_SPACES.sub(',', joined).strip(' \t\r\n')
+    tokens = np.array(joined.split(','), dtype=object)
+
+    # Row index of each token: count the separators that precede it
+    is_separator = tokens == ROW_SEPARATOR
+    rows = np.cumsum(is_separator)
+    keep = ~is_separator & ~np.isin(tokens, list(EMPTY_CUES))
+    rows, tokens = rows[keep], tokens[keep]
+
+    codes, vocabulary = pd.factorize(tokens)
+    # Sorted vocabulary makes the column order stable across runs
+    order = np.argsort(vocabulary)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    codes = rank[codes]
+    vocabulary = [str(v) for v in np.asarray(vocabulary)[order]]
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    matrix = sparse.csr_matrix(
+        (np.ones(len(codes), dtype=np.int32), codes, indptr),
+        shape=(n, len(vocabulary))
+    )
+    # A cue listed twice in the same response still counts once
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix, vocabulary
+
+def group_indicator(labels):
+    """
+    One-hot encode group labels as a sparse matrix.
+
+    Args:
+        labels (pandas.Series): Group label of each response
+
+    Returns:
+        tuple: (matrix, groups) where matrix is an n x g CSR matrix and groups the g labels
+    """
+    codes, groups = pd.factorize(labels, sort=True)
+    valid = codes >= 0
+    matrix = sparse.csr_matrix(
+        (np.ones(valid.sum(), dtype=np.int32), (np.flatnonzero(valid), codes[valid])),
+        shape=(len(labels), len(groups))
+    )
+    return matrix, list(groups)
+
+def cue_frequency_by_group(matrix, vocabulary, labels):
+    """
+    Share of responses in each group that mention each cue.
+
+    Args:
+        matrix: n x k cue indicator matrix
+        vocabulary (list): Cue names
+        labels (pandas.Series): Group label of each response
+
+    Returns:
+        tuple: (counts, shares) DataFrames with one row per group and one column per cue
+    """
+    groups_matrix, groups = group_indicator(labels)
+    counts = (groups_matrix.T @ matrix).toarray()
+    sizes = np.asarray(groups_matrix.sum(axis=0)).ravel()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        shares = counts / sizes[:, None]
+    index = pd.Index(groups, name=labels.name)
+    counts = pd.DataFrame(counts, index=index, columns=vocabulary)
+    counts.insert(0, 'Responses', sizes)
+    return counts, pd.DataFrame(shares, index=index, columns=vocabulary)
+
+def cue_cooccurrence(matrix, vocabulary):
+    """
+    Number of responses mentioning each pair of cues.
+
+    Args:
+        matrix: n x k cue indicator matrix
+        vocabulary (list): Cue names
+
+    Returns:
+        pandas.DataFrame: k x k symmetric counts; the diagonal holds the count of each cue
+    """
+    counts = (matrix.T @ matrix).toarray()
+    return pd.DataFrame(counts, index=vocabulary, columns=vocabulary)
+
+def analyze_visual_cues(df):
+    """
+    Encode the Visual Cues column and compute cue statistics.
+
+    Args:
+        df (pandas.DataFrame): Output of analyze_data (needs the Reality and Correct Guess columns)
+
+    Returns:
+        dict: Cue matrix, vocabulary and the frequency and co-occurrence tables
+    """
+    with instrumentation.stage('cues:encode', rows=len(df)):
+        matrix, vocabulary = encode_visual_cues(df[CUES_COLUMN])
+
+    with instrumentation.stage('cues:aggregate'):
+        _, by_reality = cue_frequency_by_group(matrix, vocabulary, df['Reality'])
+        correctness = df['Correct Guess'].map({True: 'Correct', False: 'Incorrect'}).rename('Guess')
+        _, by_correctness = cue_frequency_by_group(matrix, vocabulary, correctness)
+        cooccurrence = cue_cooccurrence(matrix, vocabulary)
+
+    totals = np.asarray(matrix.sum(axis=0)).ravel()
+    overall = pd.DataFrame({
+        'Responses': totals,
+        'Share': totals / max(len(df), 1)
+    }, index=pd.Index(vocabulary, name='Cue')).sort_values('Responses', ascending=False)
+
+    return {
+        'matrix': matrix,
+        'vocabulary': vocabulary,
+        'overall': overall,
+        'by_reality': by_reality,
+        'by_correctness': by_correctness,
+        'cooccurrence': cooccurrence
+    }
+
+def plot_cooccurrence(cooccurrence, output_dir='.'):
+    """
+    Plot the cue co-occurrence counts as a heatmap.
+
+    Args:
+        cooccurrence (pandas.DataFrame): Output of cue_cooccurrence
+        output_dir (str): Directory to save the plot
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    os.makedirs(output_dir, exist_ok=True)
+    with instrumentation.stage('plot:visual_cues_cooccurrence'):
+        plt.figure(figsize=(10, 8))
+        sns.heatmap(cooccurrence, annot=True, fmt='d', cmap='Blues',
+                    cbar_kws={'label': 'Number of Responses'})
+        plt.title('Visual Cues Mentioned Together', fontsize=16)
+        plt.xlabel('Visual Cue', fontsize=14)
+        plt.ylabel('Visual Cue', fontsize=14)
+        plt.tight_layout()
+        plt.savefig(os.path.join(output_dir, 'visual_cues_cooccurrence.png'), dpi=300)
+        plt.close()
+
+    print(f"Co-occurrence heatmap saved to {os.path.join(output_dir, 'visual_cues_cooccurrence.png')}")
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description='Analyze the Visual Cues reported by participants.')
+    parser.add_argument('--csv', type=str, help='Path to CSV file with QoE data')
+    parser.add_argument('--output', type=str, default='visualizations',
+                        help='Directory to save the co-occurrence heatmap')
+    parser.add_argument('--save-dir', type=str, help='Save the cue tables as CSV files in this directory')
+    parser.add_argument('--no-plot', action='store_true', help='Do not generate the heatmap')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+
+    print("Visual Cues Analysis")
+    print("--------------------")
+
+    with instrumentation.from_arguments(args):
+        df = load_data(args.csv)
+
+        if CUES_COLUMN not in df.columns:
+            print(f"Error: missing column: {CUES_COLUMN}")
+            sys.exit(1)
+
+        results = analyze_visual_cues(analyze_data(df)['df'])
+
+        with pd.option_context('display.width', 200, 'display.max_columns', 50):
+            print(f"\n{len(results['vocabulary'])} distinct cues in {results['matrix'].shape[0]} responses\n")
+            print(results['overall'].to_string(float_format=lambda x: f"{x:.2%}"))
+            print("\nShare of responses mentioning each cue, by actual reality:")
+            print(results['by_reality'].to_string(float_format=lambda x: f"{x:.0%}"))
+            print("\nShare of responses mentioning each cue, by guess correctness:")
+            print(results['by_correctness'].to_string(float_format=lambda x: f"{x:.0%}"))
+            print("\nCue co-occurrence (number of responses):")
+            print(results['cooccurrence'].to_string())
+
+        if args.save_dir:
+            os.makedirs(args.save_dir, exist_ok=True)
+            for name in ['overall', 'by_reality', 'by_correctness', 'cooccurrence']:
+                results[name].to_csv(os.path.join(args.save_dir, f"visual_cues_{name}.csv"))
+            print(f"\nCue tables saved to {args.save_dir}")
+        if not args.no_plot and results['vocabulary']:
+            plot_cooccurrence(results['cooccurrence'], args.output)
+
+if __name__ == "__main__":
+    main()